@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, TypeVar, TYPE_CHECKING
+
+from discord.utils import time_snowflake, utcnow
+
+
+__all__ = (
+    "LRUCache",
+    "SnowflakeCache",
+    "SnowflakeSet",
+    "TTLCache",
+)
+
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class _BaseCache(Generic[K, V]):
+
+    __slots__ = (
+        "hits",
+        "maxsize",
+        "misses",
+    )
+    if TYPE_CHECKING:
+        hits: int
+        maxsize: int
+        misses: int
+
+    def __init__(self, *, maxsize: int) -> None:
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be a positive integer, not {maxsize}")
+
+        self.hits = 0
+        self.maxsize = maxsize
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def display_stats(self) -> str:
+        return f"{len(self)}/{self.maxsize} items, {self.hits} hits, {self.misses} misses ({100 * self.hit_rate:.2f}% hit rate)"
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} size={len(self)} maxsize={self.maxsize} hits={self.hits} misses={self.misses}>"
+
+
+class LRUCache(_BaseCache[K, V]):
+    """A bounded mapping which evicts the least recently used
+    item when running out of space.
+
+    Lookups via ``get`` are counted as hits or misses.
+    """
+
+    __slots__ = (
+        "__data",
+    )
+    if TYPE_CHECKING:
+        __data: OrderedDict[K, V]
+
+    def __init__(self, *, maxsize: int) -> None:
+        super().__init__(maxsize=maxsize)
+        self.__data = OrderedDict()
+
+    def get(self, key: K, /) -> Optional[V]:
+        """Get the value associated with ``key`` and mark it as
+        recently used, or None if the key is not cached.
+        """
+        try:
+            value = self.__data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        else:
+            self.hits += 1
+            self.__data.move_to_end(key)
+            return value
+
+    def put(self, key: K, value: V, /) -> None:
+        """Cache a key-value pair, evicting the least recently used
+        items if necessary.
+        """
+        self.__data[key] = value
+        self.__data.move_to_end(key)
+        while len(self.__data) > self.maxsize:
+            self.__data.popitem(last=False)
+
+    def update(self, items: Iterable[Tuple[K, V]], /) -> None:
+        for key, value in items:
+            self.put(key, value)
+
+    def pop(self, key: K, /) -> Optional[V]:
+        return self.__data.pop(key, None)
+
+    def clear(self) -> None:
+        self.__data.clear()
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.__data
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self.__data)
+
+    def __len__(self) -> int:
+        return len(self.__data)
+
+
+class _TTLItem(NamedTuple):
+    expire_at: float
+    value: Any
+
+
+class TTLCache(_BaseCache[K, V]):
+    """A bounded mapping whose items expire after a fixed amount
+    of time. When running out of space, the least recently used
+    item is evicted.
+
+    Lookups via ``get`` are counted as hits or misses.
+    """
+
+    __slots__ = (
+        "__data",
+        "ttl",
+    )
+    if TYPE_CHECKING:
+        __data: OrderedDict[K, _TTLItem]
+        ttl: float
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        super().__init__(maxsize=maxsize)
+        self.__data = OrderedDict()
+        self.ttl = ttl
+
+    def get(self, key: K, /) -> Optional[V]:
+        """Get the value associated with ``key`` and mark it as
+        recently used, or None if the key is not cached or has
+        expired.
+        """
+        try:
+            item = self.__data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        if item.expire_at < time.monotonic():
+            del self.__data[key]
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.__data.move_to_end(key)
+        return item.value
+
+    def put(self, key: K, value: V, /, *, ttl: Optional[float] = None) -> None:
+        """Cache a key-value pair which expires after ``ttl`` seconds
+        (default to the cache's TTL), evicting the least recently used
+        items if necessary.
+        """
+        if ttl is None:
+            ttl = self.ttl
+
+        self.__data[key] = _TTLItem(expire_at=time.monotonic() + ttl, value=value)
+        self.__data.move_to_end(key)
+        while len(self.__data) > self.maxsize:
+            self.__data.popitem(last=False)
+
+    def pop(self, key: K, /) -> Optional[V]:
+        item = self.__data.pop(key, None)
+        return None if item is None else item.value
+
+    def discard_if(self, predicate: Callable[[K, V], bool], /) -> None:
+        """Remove all items satisfying ``predicate``"""
+        for key in [key for key, item in self.__data.items() if predicate(key, item.value)]:
+            del self.__data[key]
+
+    def clear(self) -> None:
+        self.__data.clear()
+
+    def __contains__(self, key: K) -> bool:
+        try:
+            return self.__data[key].expire_at >= time.monotonic()
+        except KeyError:
+            return False
+
+    def __len__(self) -> int:
+        return len(self.__data)
+
+
+class SnowflakeCache(Generic[V]):
+    """A bounded mapping from Discord snowflakes to values which only
+    keeps items created within a time window.
+
+    Consumers can wait for a snowflake to be observed by the cache
+    owner via ``wait_for``.
+    """
+
+    __slots__ = (
+        "__data",
+        "__observed",
+        "__waiters",
+        "maxsize",
+        "window",
+    )
+    if TYPE_CHECKING:
+        __data: OrderedDict[int, V]
+        __observed: SnowflakeSet
+        __waiters: Dict[int, List[asyncio.Future[None]]]
+        maxsize: int
+        window: datetime.timedelta
+
+    def __init__(self, *, maxsize: int, window: datetime.timedelta) -> None:
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be a positive integer, not {maxsize}")
+
+        self.__data = OrderedDict()
+        self.__observed = SnowflakeSet(window=window)
+        self.__waiters = {}
+        self.maxsize = maxsize
+        self.window = window
+
+    def prune(self) -> None:
+        """Remove items older than the time window or exceeding the size limit"""
+        cutoff = time_snowflake(utcnow() - self.window)
+        data = self.__data
+        while data and (len(data) > self.maxsize or next(iter(data)) < cutoff):
+            data.popitem(last=False)
+
+    def add(self, id: int, value: V, /) -> None:
+        self.__data[id] = value
+        self.prune()
+        self.observe(id)
+
+    def get(self, id: int, /) -> Optional[V]:
+        return self.__data.get(id)
+
+    def observe(self, id: int, /) -> None:
+        """Mark the snowflake ``id`` as processed, waking up its waiters"""
+        self.__observed.add(id)
+        for waiter in self.__waiters.pop(id, ()):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait_for(self, id: int, /, *, timeout: Optional[float] = None) -> Optional[V]:
+        """This function is a coroutine
+
+        Wait until the snowflake ``id`` has been observed and return its
+        associated value, or None if it has no associated value or the
+        timeout expired.
+        """
+        if id not in self.__observed:
+            waiter = asyncio.get_running_loop().create_future()
+            self.__waiters.setdefault(id, []).append(waiter)
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                with contextlib.suppress(KeyError, ValueError):
+                    self.__waiters[id].remove(waiter)
+                    if not self.__waiters[id]:
+                        del self.__waiters[id]
+
+        return self.__data.get(id)
+
+    def __contains__(self, id: int) -> bool:
+        return id in self.__data
+
+    def __len__(self) -> int:
+        return len(self.__data)
+
+    def __repr__(self) -> str:
+        return f"<SnowflakeCache size={len(self)} maxsize={self.maxsize} window={self.window}>"
+
+
+class SnowflakeSet:
+    """A set of Discord snowflakes which forgets items created
+    before a time window.
+
+    Snowflakes are grouped into buckets by their creation time so
+    that expired ones can be discarded a bucket at a time.
+    """
+
+    __slots__ = (
+        "__buckets",
+        "bucket_width",
+        "window",
+    )
+    if TYPE_CHECKING:
+        __buckets: Dict[int, Set[int]]
+        bucket_width: int
+        window: datetime.timedelta
+
+    def __init__(self, *, window: datetime.timedelta, bucket_width: datetime.timedelta = datetime.timedelta(seconds=10)) -> None:
+        self.__buckets = {}
+        self.bucket_width = max(1, int(bucket_width.total_seconds() * 1000))
+        self.window = window
+
+    def _bucket_of(self, id: int, /) -> int:
+        # The upper bits of a snowflake are its creation time in milliseconds since the Discord epoch
+        return (id >> 22) // self.bucket_width
+
+    def prune(self) -> None:
+        """Discard all buckets older than the time window"""
+        cutoff = self._bucket_of(time_snowflake(utcnow() - self.window))
+        for bucket in [bucket for bucket in self.__buckets if bucket < cutoff]:
+            del self.__buckets[bucket]
+
+    def add(self, id: int, /) -> bool:
+        """Add a snowflake to this set
+
+        Returns
+        -----
+        ``bool``
+            False if the snowflake was already present, True otherwise
+        """
+        bucket = self._bucket_of(id)
+        try:
+            ids = self.__buckets[bucket]
+        except KeyError:
+            self.prune()
+            ids = self.__buckets[bucket] = set()
+
+        if id in ids:
+            return False
+
+        ids.add(id)
+        return True
+
+    def memory_usage(self) -> int:
+        """Estimate the memory used by this set, in bytes"""
+        return sys.getsizeof(self.__buckets) + sum(sys.getsizeof(ids) + sum(sys.getsizeof(id) for id in ids) for ids in self.__buckets.values())
+
+    def __contains__(self, id: int) -> bool:
+        try:
+            return id in self.__buckets[self._bucket_of(id)]
+        except KeyError:
+            return False
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self.__buckets.values())
+
+    def __repr__(self) -> str:
+        return f"<SnowflakeSet size={len(self)} buckets={len(self.__buckets)} window={self.window}>"
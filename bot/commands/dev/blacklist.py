@@ -16,12 +16,7 @@ from shared import interface
 )
 @commands.is_owner()
 async def handler(ctx: Context) -> None:
-    async with interface.pool.acquire() as connection:
-        async with connection.cursor() as cursor:
-            await cursor.execute("SELECT * FROM blacklist")
-            rows = await cursor.fetchall()
-
-    count = len(set(row[0] for row in rows))
+    count = len(interface.blacklist)
     if count == 1:
         await ctx.send("There is 1 user in the blacklist.")
     else:
@@ -36,10 +31,7 @@ async def handler(ctx: Context) -> None:
 )
 @commands.is_owner()
 async def handler_add(ctx: Context, user: discord.User) -> None:
-    async with interface.pool.acquire() as connection:
-        async with connection.cursor() as cursor:
-            await cursor.execute("INSERT INTO blacklist VALUES (?)", str(user.id))
-
+    await interface.add_to_blacklist(user.id)
     await ctx.send(f"Added `{user}` to the blacklist!")
 
 
@@ -51,8 +43,5 @@ async def handler_add(ctx: Context, user: discord.User) -> None:
 )
 @commands.is_owner()
 async def handler_remove(ctx: Context, user: discord.User) -> None:
-    async with interface.pool.acquire() as connection:
-        async with connection.cursor() as cursor:
-            await cursor.execute("DELETE FROM blacklist WHERE id = ?", str(user.id))
-
+    await interface.remove_from_blacklist(user.id)
     await ctx.send(f"Removed `{user}` from the blacklist!")
@@ -1,21 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import io
+from typing import Optional
 
 import discord
 from discord.ext import commands
 
 from customs import Context
-from environment import LOG_PATH
 from shared import interface
 
 
 @interface.command(
     name="log",
     brief="dev.log",
-    description="Send the log file to the current channel",
+    description="Send the log file to the current channel. If `size` is specified, only send the last `size` KB of the log, otherwise send the full log compressed with gzip.",
+    usage="{prefix}log <size | default: full log>",
     hidden=True,
 )
 @commands.is_owner()
-async def handler(ctx: Context) -> None:
-    interface.flush_logs()
-    await ctx.send(embed=ctx.bot.display_status(), file=discord.File(LOG_PATH))
+async def handler(ctx: Context, size: Optional[int] = None) -> None:
+    if size is None:
+        data = await asyncio.to_thread(interface.logfile.compress)
+        file = discord.File(io.BytesIO(data), filename="log.txt.gz")
+    else:
+        content = await asyncio.to_thread(interface.logfile.tail, 1024 * max(size, 1))
+        file = discord.File(io.StringIO(content), filename="log.txt")
+
+    await ctx.send(embed=ctx.bot.display_status(), file=file)
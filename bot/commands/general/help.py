@@ -8,6 +8,7 @@ from discord.ext import commands
 from discord.ext.commands.core import Group
 
 import global_utils
+from fuzzy import FuzzyMatcher
 if TYPE_CHECKING:
     from haruka import Haruka
 
@@ -21,6 +22,10 @@ category_icons = {
 }
 
 
+# Command names are fixed once imported, build the indexes once (keyed by whether hidden commands are shown)
+command_matchers: Dict[bool, FuzzyMatcher] = {}
+
+
 def display_category(category: str) -> str:
     result = category.capitalize()
     result = result.replace("_", " ")
@@ -125,10 +130,14 @@ class HelpCommand(commands.HelpCommand):
 
         show_hidden = await self.bot.is_owner(self.context.author)
 
-        # Also include aliases (don't use walk_commands)
-        command_names = [command.name for command in self.bot.all_commands.values() if show_hidden or not command.hidden]
+        try:
+            matcher = command_matchers[show_hidden]
+        except KeyError:
+            # Also include aliases (don't use walk_commands)
+            command_names = sorted(command.name for command in self.bot.all_commands.values() if show_hidden or not command.hidden)
+            matcher = command_matchers[show_hidden] = FuzzyMatcher(command_names)
 
-        word = await global_utils.fuzzy_match(string, command_names)
+        word = matcher.best(string)
         return f"No command called `{string}` was found. Did you mean `{word}`?"
 
     def subcommand_not_found(self, command: commands.Command, string: str) -> str:
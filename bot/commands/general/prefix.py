@@ -5,6 +5,7 @@ from typing import Optional
 from discord.ext import commands
 
 from customs import Context
+from environment import PREFIX_MAX_LENGTH
 from shared import interface
 from global_utils import get_custom_prefix
 
@@ -25,12 +26,11 @@ async def handler(ctx: Context, prefix: Optional[str]) -> None:
         else:
             await ctx.send(f"The current prefix is `{custom_prefix}`")
 
-    elif interface.pool is not None:
-        async with interface.pool.acquire() as connection:
-            async with connection.cursor() as cursor:
-                await cursor.execute("DELETE FROM prefix WHERE id = ?", str(ctx.guild.id))
-                await cursor.execute("INSERT INTO prefix VALUES(?, ?)", str(ctx.guild.id), prefix)
+    elif len(prefix) > PREFIX_MAX_LENGTH:
+        await ctx.send(f"The prefix must not exceed {PREFIX_MAX_LENGTH} characters!")
 
+    elif interface.pool is not None:
+        await interface.set_guild_prefix(ctx.guild.id, prefix)
         await ctx.send(f"Prefix has been set to `{prefix}`")
 
     else:
@@ -1,9 +1,12 @@
 from .pause import *
 from .play import *
 from .playing import *
+from .queue import *
+from .remove import *
 from .repeat import *
 from .resume import *
 from .shuffle import *
 from .skip import *
 from .stop import *
+from .volume import *
 from .vping import *
@@ -17,6 +17,7 @@ async def join_voice(ctx: Context, channel: discord.VoiceChannel) -> youtube.Aud
         return await channel.connect(cls=youtube.AudioPlayer)
 
     vc.stop()  # Stop audio if already playing
+    vc.queue.clear()
     await vc.move_to(channel)
     return vc
 
@@ -24,7 +25,7 @@ async def join_voice(ctx: Context, channel: discord.VoiceChannel) -> youtube.Aud
 @interface.command(
     name="play",
     brief="music.play",
-    description="Play audio from YouTube. `URL` can be a URL to a YouTube video or a YouTube playlist.",
+    description="Play audio from YouTube. `URL` can be a URL to a YouTube video or a YouTube playlist. If an audio player is already playing, add it to the queue instead.",
     usage="{prefix}play <URL>",
 )
 @commands.guild_only()
@@ -40,22 +41,28 @@ async def handler(ctx: Context, url: str) -> None:
         return
 
     async with ctx.typing():
-        track = await youtube.Track.from_url(url)
-        if track is not None:
-            client = await join_voice(ctx, channel)
-            client.set_source(track)
-            client.set_target(ctx.channel)
-            asyncio.create_task(client.play())
+        source = await youtube.Track.from_url(url)
+        if source is None:
+            source = await youtube.Playlist.from_url(url)
 
+        if source is None:
+            await ctx.send(f"Cannot find any videos or public playlists from the URL `{url}`")
             return
 
-        playlist = await youtube.Playlist.from_url(url)
-        if playlist is not None:
-            client = await join_voice(ctx, channel)
-            client.set_source(playlist)
-            client.set_target(ctx.channel)
-            asyncio.create_task(client.play())
+        vc: Optional[youtube.AudioPlayer] = ctx.voice_client
+        if vc is not None and vc.active:
+            if not vc.is_listening(ctx.author):
+                await ctx.send(f"Please join {vc.channel.mention} to add to the queue!")
+                return
 
+            index = vc.enqueue(source)
+            await ctx.send(f"Added to the queue at position #{index + 1}", embed=await source.create_embed(ctx.bot))
             return
 
-        await ctx.send(f"Cannot find any videos or public playlists from the URL `{url}`")
+        client = await join_voice(ctx, channel)
+        client.enqueue(source)
+        client.set_target(ctx.channel)
+        if isinstance(source, youtube.Playlist):
+            await client.notify(embed=await source.create_embed(ctx.bot))
+
+        asyncio.create_task(client.play())
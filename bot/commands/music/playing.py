@@ -15,7 +15,7 @@ from shared import interface
 @commands.guild_only()
 async def handler(ctx: Context) -> None:
     try:
-        embed = await ctx.voice_client.playing.create_embed(ctx.bot)
+        embed = await (await ctx.voice_client.queue.current()).create_embed(ctx.bot)
         ctx.voice_client.append_state(embed)
         await ctx.send(f"Currently playing in {ctx.voice_client.channel.mention}", embed=embed)
     except AttributeError:
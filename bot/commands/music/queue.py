@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import discord
+from discord.ext import commands
+from discord.utils import escape_markdown
+
+from customs import Context
+from core import youtube
+from global_utils import format_exception, slice_string
+from shared import interface
+
+
+UPCOMING_DISPLAY = 10
+
+
+@interface.command(
+    name="queue",
+    brief="music.queue",
+    description="Display the sources in the queue and the upcoming tracks",
+    transferable=True,
+)
+@commands.guild_only()
+async def handler(ctx: Context) -> None:
+    try:
+        queue = ctx.voice_client.queue
+        embed = discord.Embed(title=f"Queue ({len(queue)} tracks)")
+
+        sources = []
+        for index, source in enumerate(queue.sources):
+            if isinstance(source, youtube.Playlist):
+                sources.append(f"**#{index + 1}** [{escape_markdown(source.title)}]({source.url}) (playlist, {source.count} tracks)")
+            else:
+                sources.append(f"**#{index + 1}** [{escape_markdown(source.title)}]({source.url})")
+
+        embed.add_field(
+            name="Sources",
+            value=slice_string("\n".join(sources), 1000) or "The queue is empty",
+            inline=False,
+        )
+
+        try:
+            current = await queue.current()
+            upcoming = await queue.upcoming(UPCOMING_DISPLAY)
+        except Exception as error:
+            # A playlist page could not be fetched, still display the sources
+            ctx.bot.log("Unable to load the tracks of the queue\n" + format_exception(error))
+            current = None
+            upcoming = []
+            embed.add_field(
+                name="Up next",
+                value="Unable to load the upcoming tracks, please try again later.",
+                inline=False,
+            )
+
+        if current is not None:
+            embed.add_field(
+                name="Now playing",
+                value=f"[{escape_markdown(current.title)}]({current.url})",
+                inline=False,
+            )
+
+        if upcoming:
+            embed.add_field(
+                name="Up next",
+                value=slice_string("\n".join(f"**{index + 1}.** [{escape_markdown(track.title)}]({track.url})" for index, track in enumerate(upcoming)), 1000),
+                inline=False,
+            )
+
+        ctx.voice_client.append_state(embed)
+        await ctx.send(embed=embed)
+
+    except AttributeError:
+        if not await interface.transfer(ctx):
+            await ctx.send("No audio player is currently playing!")
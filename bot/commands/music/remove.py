@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from discord.ext import commands
+
+from customs import Context
+from shared import interface
+
+
+@interface.command(
+    name="remove",
+    brief="music.remove",
+    description="Remove a source from the queue. `position` is the number of the source displayed by the `queue` command.",
+    usage="{prefix}remove <position>",
+    transferable=True,
+)
+@commands.guild_only()
+@commands.max_concurrency(1, commands.BucketType.guild, wait=True)
+async def handler(ctx: Context, position: int) -> None:
+    try:
+        queue = ctx.voice_client.queue
+        if not ctx.voice_client.is_listening(ctx.author):
+            await ctx.send(f"Please join {ctx.voice_client.channel.mention} to edit the queue!")
+            return
+
+        if not 1 <= position <= len(queue.sources):
+            await ctx.send(f"Position must be between 1 and {len(queue.sources)}!")
+            return
+
+        source = queue.remove(position - 1)
+        await ctx.send(f"Removed **{source.title}** from the queue.")
+
+    except AttributeError:
+        if not await interface.transfer(ctx):
+            await ctx.send("No audio player is currently playing!")
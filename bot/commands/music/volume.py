@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from discord.ext import commands
+
+from core import youtube
+from customs import Context
+from shared import interface
+
+
+@interface.command(
+    name="volume",
+    brief="music.volume",
+    description="Show or set the playback volume in percent. The new volume applies from the next track.",
+    usage="{prefix}volume <percent | default: show the current volume>",
+    transferable=True,
+)
+@commands.guild_only()
+@commands.max_concurrency(1, commands.BucketType.guild, wait=True)
+async def handler(ctx: Context, percent: Optional[int] = None) -> None:
+    try:
+        if percent is None:
+            await ctx.send(f"The current volume is `{ctx.voice_client.volume:.0%}`")
+
+        elif not ctx.voice_client.is_listening(ctx.author):
+            await ctx.send(f"Please join {ctx.voice_client.channel.mention} to change the volume!")
+
+        elif not 0 <= percent <= 100 * youtube.players.MAX_VOLUME:
+            await ctx.send(f"Volume must be between 0% and {youtube.players.MAX_VOLUME:.0%}!")
+
+        else:
+            ctx.voice_client.set_volume(percent / 100)
+            await ctx.send(f"Volume has been set to `{percent}%`. It will apply from the next track.")
+
+    except AttributeError:
+        if not await interface.transfer(ctx):
+            await ctx.send("No audio player is currently playing!")
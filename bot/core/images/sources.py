@@ -1,35 +1,139 @@
 from __future__ import annotations
 
 import asyncio
-import contextlib
+import json
 import random
-from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
 
-from .errors import CategoryNotFound
-from global_utils import fuzzy_match, slice_string
+import aiohttp
+
+from .errors import CategoryNotFound, ImageClientException
+from fuzzy import FuzzyMatcher
+from global_utils import TimingContextManager, format_exception, slice_string
 from shared import SharedInterface
 
 
 __all__ = (
+    "display_router_stats",
     "get_image",
     "list_categories",
     "unknown_category_message",
 )
 
 
+LOW_WATERMARK = 5  # Minimum number of buffered URLs per category
+MAX_LOW_WATERMARK = 60
+MAX_BUFFERED_URLS = 1000  # Across all sources
+DEMAND_HALF_LIFE = 300.0
+ROUTE_EWMA_ALPHA = 0.3
+ROUTE_ERROR_PENALTY = 5.0  # Seconds added to the expected latency of a source with a 100% error rate
+TAG_REFRESH_INTERVAL = 6 * 3600.0
+TAG_RETRY_INITIAL_DELAY = 5.0
+TAG_RETRY_MAX_DELAY = 600.0
+TAG_DISK_DIR: Optional[Path] = Path("image-tags")  # Set to None to disable persistence
+
+
+class _Demand:
+    """An exponentially decaying counter of requests for a category"""
+
+    __slots__ = (
+        "updated",
+        "value",
+    )
+    if TYPE_CHECKING:
+        updated: float
+        value: float
+
+    def __init__(self) -> None:
+        self.updated = time.monotonic()
+        self.value = 0.0
+
+    def current(self) -> float:
+        now = time.monotonic()
+        self.value *= 0.5 ** ((now - self.updated) / DEMAND_HALF_LIFE)
+        self.updated = now
+        return self.value
+
+    def hit(self) -> None:
+        self.value = self.current() + 1.0
+
+
+class _RouteStats:
+    """Latency and error rate of upstream fetches for a category"""
+
+    __slots__ = (
+        "error_rate",
+        "errors",
+        "latency",
+        "requests",
+    )
+    if TYPE_CHECKING:
+        error_rate: float
+        errors: int
+        latency: Optional[float]
+        requests: int
+
+    def __init__(self) -> None:
+        self.error_rate = 0.0
+        self.errors = 0
+        self.latency = None
+        self.requests = 0
+
+    @property
+    def score(self) -> float:
+        """The expected cost of a fetch in seconds, lower is better"""
+        return (self.latency or 0.0) + self.error_rate * ROUTE_ERROR_PENALTY
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self.error_rate *= 1 - ROUTE_EWMA_ALPHA
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += ROUTE_EWMA_ALPHA * (latency - self.latency)
+
+    def record_failure(self) -> None:
+        self.requests += 1
+        self.errors += 1
+        self.error_rate += ROUTE_EWMA_ALPHA * (1 - self.error_rate)
+
+    def __repr__(self) -> str:
+        latency = "N/A" if self.latency is None else f"{1000 * self.latency:.0f}ms"
+        return f"<_RouteStats latency={latency} error_rate={self.error_rate:.2f} score={self.score:.3f}>"
+
+
 class ImageSource:
+    """Base class of image sources.
+
+    Image URLs are buffered per category. After each request, the buffer
+    is topped up in the background when it drops below a low watermark,
+    which grows with the demand for that category.
+
+    Supported categories are refreshed periodically, and the last
+    successfully fetched ones are kept on disk to be used at startup.
+    """
 
     __slots__ = (
-        "_cache_lock",
+        "_demand",
+        "_fetches",
         "_ready",
+        "_refills",
+        "_stats",
+        "_tag_refresher",
         "_urls_queue",
         "nsfw",
         "sfw",
     )
     __instance__: Optional[ImageSource] = None
     if TYPE_CHECKING:
-        _cache_lock: asyncio.Lock
+        _demand: Dict[Tuple[str, bool], _Demand]
+        _fetches: Dict[Tuple[str, bool], asyncio.Task[int]]
         _ready: asyncio.Event
+        _refills: Dict[Tuple[str, bool], asyncio.Task[None]]
+        _stats: Dict[Tuple[str, bool], _RouteStats]
+        _tag_refresher: asyncio.Task[None]
         _urls_queue: Dict[str, Tuple[asyncio.Queue[str], asyncio.Queue[str]]]
         nsfw: Tuple[str, ...]
         sfw: Tuple[str, ...]
@@ -37,52 +141,93 @@ class ImageSource:
     def __new__(cls) -> ImageSource:
         if cls.__instance__ is None:
             self = super().__new__(cls)
-            self._cache_lock = asyncio.Lock()
+            self._demand = {}
+            self._fetches = {}
             self._ready = asyncio.Event()
+            self._refills = {}
+            self._stats = {}
             self._urls_queue = {}
             self.nsfw = ()
             self.sfw = ()
 
-            task = asyncio.create_task(self.populate_tags())
-            task.add_done_callback(lambda _: self._when_ready())
-
             cls.__instance__ = self
 
+            if self._load_tags():
+                self._ready.set()
+
+            self._tag_refresher = asyncio.create_task(self._refresh_tags())
+
         return cls.__instance__
 
     def is_ready(self) -> bool:
         return self._ready.is_set()
 
-    def _when_ready(self) -> None:
-        sfw_display = ", ".join(self.sfw)
-        nsfw_display = ", ".join(self.nsfw)
+    @classmethod
+    def _tags_path(cls) -> Optional[Path]:
+        if TAG_DISK_DIR is None:
+            return None
+
+        return TAG_DISK_DIR / f"{cls.__name__}.json"
 
-        interface = SharedInterface()
-        interface.log(f"Got {len(self.sfw)} + {len(self.nsfw)} categories from waifu.im:\nsfw: {sfw_display}\nnsfw: {nsfw_display}")
+    def _set_tags(self, sfw: Tuple[str, ...], nsfw: Tuple[str, ...]) -> None:
+        # Swap both tuples at once, then rebuild the category index
+        self.sfw, self.nsfw = sfw, nsfw
+        _rebuild_category_index()
 
-        self._ready.set()
+    def _load_tags(self) -> bool:
+        path = self._tags_path()
+        if path is None:
+            return False
+
+        try:
+            with path.open("r", encoding="utf-8") as file:
+                data = json.load(file)
+
+            self._set_tags(tuple(data["sfw"]), tuple(data["nsfw"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        SharedInterface().log(f"Loaded {len(self.sfw)} + {len(self.nsfw)} categories of {self.__class__.__name__} from {path}")
+        return True
+
+    def _save_tags(self) -> None:
+        path = self._tags_path()
+        if path is None:
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix(".tmp")
+        with temp.open("w", encoding="utf-8") as file:
+            json.dump({"sfw": self.sfw, "nsfw": self.nsfw}, file)
+
+        temp.replace(path)
+
+    async def _refresh_tags(self) -> None:
+        delay = TAG_RETRY_INITIAL_DELAY
+        while True:
+            try:
+                await self.populate_tags()
+            except Exception as error:
+                next_refresh = delay * random.uniform(0.8, 1.2)
+                delay = min(2 * delay, TAG_RETRY_MAX_DELAY)
+                SharedInterface().log(f"Unable to fetch categories of {self.__class__.__name__}, retrying in {next_refresh:.1f}s\n" + format_exception(error))
+            else:
+                next_refresh = TAG_REFRESH_INTERVAL
+                delay = TAG_RETRY_INITIAL_DELAY
+
+            # Do not block requests forever if the first attempt failed
+            self._ready.set()
+            await asyncio.sleep(next_refresh)
 
     async def wait_until_ready(self) -> None:
         await self._ready.wait()
 
+    def supports(self, category: str, *, sfw: bool = True) -> bool:
+        return self in _category_index.sources.get((category, sfw), ())
+
     async def check_category(self, category: str, *, sfw: bool = True) -> None:
         await self.wait_until_ready()
-        search = self.sfw if sfw else self.nsfw
-        low = 0
-        high = len(search)
-
-        if high == 0:
-            raise CategoryNotFound(category, sfw=sfw)
-
-        # Result is in interval [low, high)
-        while high - low > 1:
-            mid = (low + high) // 2
-            if search[mid] > category:
-                high = mid
-            else:
-                low = mid
-
-        if search[low] != category:
+        if not self.supports(category, sfw=sfw):
             raise CategoryNotFound(category, sfw=sfw)
 
     async def _obtain_cache(self, category: str, *, sfw: bool = True) -> asyncio.Queue[str]:
@@ -93,50 +238,277 @@ class ImageSource:
             self._urls_queue[category] = (asyncio.Queue(), asyncio.Queue())
             return self._urls_queue[category][sfw]
 
+    @property
+    def buffered(self) -> int:
+        """The total number of buffered URLs of this source"""
+        return sum(sfw.qsize() + nsfw.qsize() for nsfw, sfw in self._urls_queue.values())
+
+    def has_buffered(self, category: str, *, sfw: bool = True) -> bool:
+        try:
+            return not self._urls_queue[category][sfw].empty()
+        except KeyError:
+            return False
+
+    def route_stats(self, category: str, *, sfw: bool = True) -> _RouteStats:
+        try:
+            return self._stats[category, sfw]
+        except KeyError:
+            stats = self._stats[category, sfw] = _RouteStats()
+            return stats
+
+    def low_watermark(self, category: str, *, sfw: bool = True) -> int:
+        try:
+            demand = self._demand[category, sfw].current()
+        except KeyError:
+            demand = 0.0
+
+        return min(MAX_LOW_WATERMARK, LOW_WATERMARK + int(demand))
+
     async def get_image(self, category: str, *, sfw: bool = True) -> str:
         cache = await self._obtain_cache(category, sfw=sfw)
+        try:
+            self._demand[category, sfw].hit()
+        except KeyError:
+            demand = self._demand[category, sfw] = _Demand()
+            demand.hit()
 
         # Non-blocking when cache is not empty
-        if cache.empty():
-            async with self._cache_lock:
-                # Check if cache is really empty at this time
-                if cache.empty():
-                    await self.populate_cache(cache, category=category, sfw=sfw)
+        fetched = False
+        while cache.empty():
+            if await self._fetch(cache, category=category, sfw=sfw) == 0:
+                raise ImageClientException(f"{self.__class__.__name__} returned no images for {category!r} (sfw={sfw})")
 
-        return await cache.get()
+            fetched = True
 
-    async def populate_cache(self, cache: asyncio.Queue[str], *, category: str, sfw: bool = True) -> None:
+        url = cache.get_nowait()
+        if fetched:
+            _trim_buffers()
+
+        self._schedule_refill(category, sfw=sfw)
+        return url
+
+    async def _fetch(self, cache: asyncio.Queue[str], *, category: str, sfw: bool) -> int:
+        # Populate the cache of a category once, concurrent callers share the same fetch.
+        # Return the number of added URLs.
+        key = (category, sfw)
+        try:
+            task = self._fetches[key]
+        except KeyError:
+            task = self._fetches[key] = asyncio.create_task(self.__populate(cache, category=category, sfw=sfw))
+            task.add_done_callback(lambda _: self._fetches.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    async def __populate(self, cache: asyncio.Queue[str], *, category: str, sfw: bool) -> int:
+        stats = self.route_stats(category, sfw=sfw)
+        with TimingContextManager() as measure:
+            try:
+                added = await self.populate_cache(cache, category=category, sfw=sfw)
+            except Exception:
+                stats.record_failure()
+                raise
+
+        if added > 0:
+            stats.record_success(measure.result)
+        else:
+            stats.record_failure()
+
+        return added
+
+    def _schedule_refill(self, category: str, *, sfw: bool) -> None:
+        key = (category, sfw)
+        if key in self._refills:
+            return
+
+        cache = self._urls_queue[category][sfw]
+        if cache.qsize() < self.low_watermark(category, sfw=sfw):
+            task = self._refills[key] = asyncio.create_task(self._refill(cache, category=category, sfw=sfw))
+            task.add_done_callback(lambda _: self._refills.pop(key, None))
+
+    async def _refill(self, cache: asyncio.Queue[str], *, category: str, sfw: bool) -> None:
+        try:
+            while cache.qsize() < self.low_watermark(category, sfw=sfw) and _buffered() < MAX_BUFFERED_URLS:
+                if await self._fetch(cache, category=category, sfw=sfw) == 0:
+                    break
+
+        except Exception as error:
+            SharedInterface().log(f"Unable to refill {self.__class__.__name__} cache for {category!r} (sfw={sfw})\n" + format_exception(error))
+
+        _trim_buffers()
+
+    async def populate_cache(self, cache: asyncio.Queue[str], *, category: str, sfw: bool = True) -> int:
+        """This function is a coroutine
+
+        Fetch image URLs of ``category`` from upstream and put them into
+        ``cache``.
+
+        Returns
+        -----
+        ``int``
+            The number of URLs put into ``cache``
+        """
         raise NotImplementedError
 
     async def populate_tags(self) -> None:
+        """This function is a coroutine
+
+        Fetch the supported categories from upstream, replace the current
+        ones and save them to disk.
+        """
+        sfw, nsfw = await self.fetch_tags()
+        sfw = tuple(sorted(set(sfw)))
+        nsfw = tuple(sorted(set(nsfw)))
+        if (sfw, nsfw) == (self.sfw, self.nsfw):
+            return
+
+        self._set_tags(sfw, nsfw)
+        SharedInterface().log(f"Got {len(sfw)} + {len(nsfw)} categories from {self.__class__.__name__}:\nsfw: {', '.join(sfw)}\nnsfw: {', '.join(nsfw)}")
+
+        try:
+            await asyncio.to_thread(self._save_tags)
+        except OSError as error:
+            SharedInterface().log(f"Unable to save categories of {self.__class__.__name__}\n" + format_exception(error))
+
+    async def fetch_tags(self) -> Tuple[Iterable[str], Iterable[str]]:
+        """This function is a coroutine
+
+        Fetch the supported SFW and NSFW categories from upstream.
+        """
         raise NotImplementedError
 
+    def display_stats(self) -> str:
+        requests = sum(stats.requests for stats in self._stats.values())
+        errors = sum(stats.errors for stats in self._stats.values())
+        latencies = [stats.latency for stats in self._stats.values() if stats.latency is not None]
+        latency = f"{1000 * sum(latencies) / len(latencies):.0f}ms" if latencies else "N/A"
+        return f"{self.__class__.__name__}: {self.buffered} buffered URLs, {requests} fetches, {errors} errors, average latency {latency}"
+
 
 async def get_image(category: str, *, sfw: bool = True) -> Optional[str]:
-    types = ImageSource.__subclasses__()
-    random.shuffle(types)
-    for type in types:
-        source = type()
-        with contextlib.suppress(CategoryNotFound):
+    """This function is a coroutine
+
+    Get an image URL from the best source supporting ``category``.
+
+    Only the sources whose categories are already loaded are considered,
+    the others are waited for only if none of them supports ``category``.
+    Sources with buffered URLs are preferred, then sources with the
+    lowest expected fetch latency. If a source fails, the next one is
+    tried.
+
+    Returns
+    -----
+    Optional[``str``]
+        The image URL, or None if no source supports the category
+    """
+    await _wait_until_ready(until=lambda: (category, sfw) in _category_index.sources)
+
+    candidates = list(_category_index.sources.get((category, sfw), ()))
+    random.shuffle(candidates)  # Break ties randomly
+    candidates.sort(key=lambda source: (not source.has_buffered(category, sfw=sfw), source.route_stats(category, sfw=sfw).score))
+
+    if candidates and not candidates[0].has_buffered(category, sfw=sfw):
+        decision = ", ".join(f"{source.__class__.__name__} {source.route_stats(category, sfw=sfw)!r}" for source in candidates)
+        SharedInterface().log(f"Routing image request for {category!r} (sfw={sfw}) to upstream: {decision}")
+
+    error: Optional[Exception] = None
+    for source in candidates:
+        try:
             return await source.get_image(category, sfw=sfw)
+        except CategoryNotFound:
+            pass
+        except (aiohttp.ClientError, asyncio.TimeoutError, ImageClientException) as e:
+            error = e
+            SharedInterface().log(f"{source.__class__.__name__} failed to serve {category!r} (sfw={sfw}), failing over\n" + format_exception(e))
+
+    if error is not None:
+        raise error
 
     return None
 
 
-async def list_categories(*, sfw: bool) -> List[str]:
-    results = []
-    for type in ImageSource.__subclasses__():
-        source = type()
-        await source.wait_until_ready()
-        results.extend(source.sfw if sfw else source.nsfw)
+def display_router_stats() -> str:
+    return "\n".join(source.display_stats() for source in _instances()) or "No image sources were used"
+
+
+def _instances() -> List[ImageSource]:
+    return [type.__instance__ for type in ImageSource.__subclasses__() if type.__instance__ is not None]
+
+
+def _buffered() -> int:
+    return sum(source.buffered for source in _instances())
+
+
+def _trim_buffers() -> None:
+    # Drop URLs of the least demanded categories, across all sources, until the buffer cap is met
+    excess = _buffered() - MAX_BUFFERED_URLS
+    if excess <= 0:
+        return
+
+    keys = [(source, category, sfw) for source in _instances() for category, sfw in source._demand]
+    keys.sort(key=lambda key: key[0]._demand[key[1], key[2]].current())
+    for source, category, sfw in keys:
+        cache = source._urls_queue[category][sfw]
+        while excess > 0 and not cache.empty():
+            cache.get_nowait()
+            excess -= 1
+
+        if excess <= 0:
+            break
+
 
-    return sorted(set(results))
+class _CategoryIndex(NamedTuple):
+    categories: Dict[bool, Tuple[str, ...]]
+    sources: Dict[Tuple[str, bool], Tuple[ImageSource, ...]]
+    matchers: Dict[bool, FuzzyMatcher]
+
+    @classmethod
+    def build(cls, sources: Iterable[ImageSource]) -> _CategoryIndex:
+        mapping: Dict[Tuple[str, bool], List[ImageSource]] = {}
+        for source in sources:
+            for sfw in (True, False):
+                for category in source.sfw if sfw else source.nsfw:
+                    mapping.setdefault((category, sfw), []).append(source)
+
+        categories = {sfw: tuple(sorted(category for category, mode in mapping if mode == sfw)) for sfw in (True, False)}
+        return cls(
+            categories=categories,
+            sources={key: tuple(value) for key, value in mapping.items()},
+            matchers={sfw: FuzzyMatcher(categories[sfw]) for sfw in (True, False)},
+        )
+
+
+# Merged index of the categories supported by the instantiated sources, replaced whenever tags are loaded
+_category_index = _CategoryIndex.build(())
+
+
+def _rebuild_category_index() -> None:
+    global _category_index
+    _category_index = _CategoryIndex.build(_instances())
+
+
+async def _wait_until_ready(*, until: Optional[Callable[[], bool]] = None) -> None:
+    # Wait until every source is ready, or stop early as soon as until() holds
+    sources = [type() for type in ImageSource.__subclasses__()]
+    pending = {asyncio.create_task(source.wait_until_ready()) for source in sources if not source.is_ready()}
+    try:
+        while pending and (until is None or not until()):
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def list_categories(*, sfw: bool) -> List[str]:
+    await _wait_until_ready()
+    return list(_category_index.categories[sfw])
 
 
 async def unknown_category_message(category: str, *, sfw: bool) -> str:
     message = f"Unsupported category `{slice_string(category, 800)}`. "
     if len(category) < 300:
-        guess = await fuzzy_match(category, await list_categories(sfw=sfw))
-        message += f"Did you mean `{guess}`?"
+        await _wait_until_ready()
+        guess = _category_index.matchers[sfw].best(category)
+        if guess is not None:
+            message += f"Did you mean `{guess}`?"
 
     return message
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import asyncio
-from typing import ClassVar
+from typing import ClassVar, Iterable, Tuple
 
 from yarl import URL
 
+from .errors import ImageClientException
 from .sources import ImageSource
 from shared import SharedInterface
 
@@ -17,7 +18,7 @@ class WaifuImSource(ImageSource):
     __slots__ = ()
     BASE_URL: ClassVar[URL] = URL.build(scheme="https", host="api.waifu.im")
 
-    async def populate_cache(self, cache: asyncio.Queue[str], *, category: str, sfw: bool = True) -> None:
+    async def populate_cache(self, cache: asyncio.Queue[str], *, category: str, sfw: bool = True) -> int:
         interface = SharedInterface()
 
         url = self.BASE_URL
@@ -31,21 +32,29 @@ class WaifuImSource(ImageSource):
         )
 
         async with interface.session.get(url) as response:
-            data = await response.json(encoding="utf-8")
-            for image in data["images"]:
-                await cache.put(image["url"])
+            response.raise_for_status()
+            try:
+                data = await response.json(encoding="utf-8")
+                urls = [image["url"] for image in data["images"]]
+            except (KeyError, TypeError, ValueError) as error:
+                raise ImageClientException(f"Malformed response from {url}") from error
+
+        for image_url in urls:
+            await cache.put(image_url)
+
+        return len(urls)
 
-    async def populate_tags(self) -> None:
+    async def fetch_tags(self) -> Tuple[Iterable[str], Iterable[str]]:
         interface = SharedInterface()
 
         url = self.BASE_URL
         url = url.with_path("/tags")
 
         async with interface.session.get(url) as response:
+            response.raise_for_status()
             data = await response.json(encoding="utf-8")
 
             versatile = set(data["versatile"])
             nsfw = set(data["nsfw"])
 
-            self.sfw = tuple(sorted(versatile))
-            self.nsfw = tuple(sorted(versatile | nsfw))
+            return versatile, versatile | nsfw
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import asyncio
-from typing import ClassVar, Dict, List, Literal
+from typing import ClassVar, Dict, Iterable, List, Literal, Tuple
 
 from yarl import URL
 
+from .errors import ImageClientException
 from .sources import ImageSource
 from shared import SharedInterface
 
@@ -18,7 +19,7 @@ class WaifuPicsSource(ImageSource):
     BASE_URL: ClassVar[URL] = URL.build(scheme="https", host="api.waifu.pics")
     DUMMY_JSON: ClassVar[Dict[Literal["exclude"], List[str]]] = {"exclude": [""]}  # Damn that API
 
-    async def populate_cache(self, cache: asyncio.Queue[str], *, category: str, sfw: bool = True) -> None:
+    async def populate_cache(self, cache: asyncio.Queue[str], *, category: str, sfw: bool = True) -> int:
         interface = SharedInterface()
         type = "sfw" if sfw else "nsfw"
 
@@ -26,18 +27,26 @@ class WaifuPicsSource(ImageSource):
         url = url.with_path(f"/many/{type}/{category}")
 
         async with interface.session.post(url, data=self.DUMMY_JSON) as response:
-            data = await response.json(encoding="utf-8")
-            for url in data["files"]:
-                await cache.put(url)
+            response.raise_for_status()
+            try:
+                data = await response.json(encoding="utf-8")
+                urls = list(data["files"])
+            except (KeyError, TypeError, ValueError) as error:
+                raise ImageClientException(f"Malformed response from {url}") from error
+
+        for image_url in urls:
+            await cache.put(image_url)
+
+        return len(urls)
 
-    async def populate_tags(self) -> None:
+    async def fetch_tags(self) -> Tuple[Iterable[str], Iterable[str]]:
         interface = SharedInterface()
 
         url = self.BASE_URL
         url = url.with_path("/endpoints")
 
         async with interface.session.get(url) as response:
+            response.raise_for_status()
             data = await response.json(encoding="utf-8")
 
-            self.sfw = tuple(sorted(data["sfw"]))
-            self.nsfw = tuple(sorted(data["nsfw"]))
+            return data["sfw"], data["nsfw"]
@@ -1,4 +1,7 @@
+from .audio_cache import *
+from .cache import *
 from .client import *
 from .players import *
 from .playlists import *
+from .queues import *
 from .tracks import *
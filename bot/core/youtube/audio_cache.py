@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import ClassVar, Dict, Optional, Set, Tuple, TYPE_CHECKING
+
+from caches import LRUCache
+from global_utils import format_exception
+from shared import SharedInterface
+if TYPE_CHECKING:
+    from .tracks import Track
+
+
+__all__ = (
+    "AudioCache",
+)
+
+
+AUDIO_CACHE_DIR = Path("audio-cache")
+AUDIO_CACHE_MAX_SIZE = 2 * 1024 ** 3
+AUDIO_CACHE_CONCURRENT_DOWNLOADS = 2
+AUDIO_CACHE_MAX_PENDING_DOWNLOADS = 8  # Including the running ones
+AUDIO_CACHE_MIN_PLAYS = 2  # Number of plays of a track before it is cached
+AUDIO_CACHE_PLAY_HISTORY = 5000  # Number of tracks whose play count is remembered
+AUDIO_CACHE_BITRATE = 128  # kbps
+AUDIO_CACHE_VOLUME = 0.2  # Volume baked into cached files
+
+
+class AudioCache:
+    """On-disk cache of track audio encoded as Ogg/Opus, evicting the
+    least recently played files when exceeding ``AUDIO_CACHE_MAX_SIZE``
+    bytes.
+
+    A track is downloaded in the background once it has been played
+    ``AUDIO_CACHE_MIN_PLAYS`` times, so that one-off plays do not fetch
+    the audio twice and later plays can stream the file to Discord
+    without re-encoding.
+    """
+
+    __instance__: ClassVar[Optional[AudioCache]] = None
+    __slots__ = (
+        "__downloading",
+        "__entries",
+        "__plays",
+        "__semaphore",
+        "interface",
+    )
+    if TYPE_CHECKING:
+        __downloading: Set[str]
+        __entries: Dict[str, Tuple[int, float]]  # Track ID -> (size, last used)
+        __plays: LRUCache[str, int]
+        __semaphore: asyncio.Semaphore
+        interface: SharedInterface
+
+    def __new__(cls) -> AudioCache:
+        if cls.__instance__ is None:
+            self = super().__new__(cls)
+            self.__downloading = set()
+            self.__entries = {}
+            self.__plays = LRUCache(maxsize=AUDIO_CACHE_PLAY_HISTORY)
+            self.__semaphore = asyncio.Semaphore(AUDIO_CACHE_CONCURRENT_DOWNLOADS)
+            self.interface = SharedInterface()
+
+            AUDIO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            for path in AUDIO_CACHE_DIR.glob("*.ogg"):
+                stat = path.stat()
+                self.__entries[path.stem] = (stat.st_size, stat.st_mtime)
+
+            cls.__instance__ = self
+
+        return cls.__instance__
+
+    @property
+    def size(self) -> int:
+        return sum(size for size, _ in self.__entries.values())
+
+    @staticmethod
+    def path_of(track: Track) -> Path:
+        return AUDIO_CACHE_DIR / f"{track.id}.ogg"
+
+    def get(self, track: Track) -> Optional[Path]:
+        """Return the path to the cached audio of ``track`` and mark it as
+        recently used, or None if it is not cached.
+        """
+        try:
+            size, _ = self.__entries[track.id]
+        except KeyError:
+            return None
+
+        path = self.path_of(track)
+        if not path.is_file():
+            del self.__entries[track.id]
+            return None
+
+        now = time.time()
+        self.__entries[track.id] = (size, now)
+        os.utime(path, (now, now))
+        return path
+
+    def schedule_download(self, track: Track, audio_url: str) -> None:
+        """Record a play of ``track`` which is not cached yet, and download
+        and encode its audio in the background if it has been played often
+        enough and not too many downloads are pending.
+        """
+        if track.id in self.__entries or track.id in self.__downloading:
+            return
+
+        plays = (self.__plays.get(track.id) or 0) + 1
+        self.__plays.put(track.id, plays)
+        if plays < AUDIO_CACHE_MIN_PLAYS or len(self.__downloading) >= AUDIO_CACHE_MAX_PENDING_DOWNLOADS:
+            return
+
+        self.__downloading.add(track.id)
+        task = asyncio.create_task(self.__download(track, audio_url))
+        task.add_done_callback(lambda _: self.__downloading.discard(track.id))
+
+    async def __download(self, track: Track, audio_url: str) -> None:
+        path = self.path_of(track)
+        temp = path.with_suffix(".tmp")
+        async with self.__semaphore:
+            process = await asyncio.create_subprocess_exec(
+                "ffmpeg",
+                "-nostdin", "-y", "-loglevel", "error",
+                "-reconnect", "1",
+                "-reconnect_streamed", "1",
+                "-reconnect_delay_max", "1",
+                "-i", audio_url,
+                "-vn",
+                "-filter:a", f"volume={AUDIO_CACHE_VOLUME}",
+                "-c:a", "libopus",
+                "-b:a", f"{AUDIO_CACHE_BITRATE}k",
+                "-ar", "48000",
+                "-ac", "2",
+                "-f", "ogg",
+                str(temp),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate()
+
+        if process.returncode != 0:
+            self.interface.log(f"Unable to cache audio of {track} (return code {process.returncode}):\n{stderr.decode('utf-8', errors='replace')}")
+            temp.unlink(missing_ok=True)
+            return
+
+        try:
+            temp.replace(path)
+            self.__entries[track.id] = (path.stat().st_size, time.time())
+        except OSError as error:
+            self.interface.log(f"Unable to cache audio of {track}\n" + format_exception(error))
+            return
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used files until the cache fits within
+        ``AUDIO_CACHE_MAX_SIZE`` bytes.
+        """
+        total = self.size
+        if total <= AUDIO_CACHE_MAX_SIZE:
+            return
+
+        for id, (size, _) in sorted(self.__entries.items(), key=lambda item: item[1][1]):
+            (AUDIO_CACHE_DIR / f"{id}.ogg").unlink(missing_ok=True)
+            del self.__entries[id]
+
+            total -= size
+            if total <= AUDIO_CACHE_MAX_SIZE:
+                break
+
+    def __repr__(self) -> str:
+        return f"<AudioCache files={len(self.__entries)} size={self.size}>"
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, ClassVar, Dict, Optional, TYPE_CHECKING
+
+from caches import TTLCache
+from shared import SharedInterface
+
+
+__all__ = (
+    "MetadataCache",
+)
+
+
+METADATA_TTL = 6 * 3600.0
+METADATA_CACHE_SIZE = 2000
+METADATA_DISK_PATH: Optional[str] = "./youtube-metadata.db"  # Set to None to disable persistence
+METADATA_PURGE_INTERVAL = 100  # Number of writes between purges of expired items from disk
+
+
+class MetadataCache:
+    """Cache for Invidious video and playlist metadata, keyed by
+    ``"<kind>:<id>"`` (e.g. ``"video:dQw4w9WgXcQ"``).
+
+    Items are kept in memory with a TTL and a size bound, and are
+    optionally persisted in a SQLite database so that they survive
+    restarts. The database is opened on first use from a worker thread.
+    """
+
+    __instance__: ClassVar[Optional[MetadataCache]] = None
+    __slots__ = (
+        "__connection",
+        "__lock",
+        "__opened",
+        "__writes",
+        "memory",
+    )
+    if TYPE_CHECKING:
+        __connection: Optional[sqlite3.Connection]
+        __lock: threading.Lock
+        __opened: bool
+        __writes: int
+        memory: TTLCache[str, Dict[str, Any]]
+
+    def __new__(cls) -> MetadataCache:
+        if cls.__instance__ is None:
+            self = super().__new__(cls)
+            self.__connection = None
+            self.__lock = threading.Lock()
+            self.__opened = METADATA_DISK_PATH is None
+            self.__writes = 0
+            self.memory = TTLCache(maxsize=METADATA_CACHE_SIZE, ttl=METADATA_TTL)
+
+            cls.__instance__ = self
+
+        return cls.__instance__
+
+    @property
+    def persistent(self) -> bool:
+        """Whether the disk store is enabled and was not found unusable"""
+        return not self.__opened or self.__connection is not None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        # Open the disk store on first use. Must hold __lock.
+        if not self.__opened:
+            self.__opened = True
+            try:
+                connection = sqlite3.connect(METADATA_DISK_PATH, check_same_thread=False)
+                connection.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, data TEXT NOT NULL, expire_at REAL NOT NULL)")
+                connection.execute("CREATE INDEX IF NOT EXISTS metadata_expire_at ON metadata (expire_at)")
+                connection.execute("DELETE FROM metadata WHERE expire_at < ?", (time.time(),))
+                connection.commit()
+                self.__connection = connection
+            except sqlite3.Error as error:
+                SharedInterface().log(f"Unable to open YouTube metadata store at {METADATA_DISK_PATH}: {error!r}")
+
+        return self.__connection
+
+    def _load(self, key: str, /) -> Optional[Dict[str, Any]]:
+        with self.__lock:
+            connection = self._connect()
+            if connection is None:
+                return None
+
+            row = connection.execute("SELECT data, expire_at FROM metadata WHERE key = ?", (key,)).fetchone()
+
+        if row is None or row[1] < time.time():
+            return None
+
+        return json.loads(row[0])
+
+    def _store(self, key: str, data: Dict[str, Any], /) -> None:
+        now = time.time()
+        with self.__lock:
+            connection = self._connect()
+            if connection is None:
+                return
+
+            connection.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?, ?)", (key, json.dumps(data, separators=(",", ":")), now + METADATA_TTL))
+            self.__writes += 1
+            if self.__writes % METADATA_PURGE_INTERVAL == 0:
+                connection.execute("DELETE FROM metadata WHERE expire_at < ?", (now,))
+
+            connection.commit()
+
+    async def get(self, key: str, /, *, memory: bool = True) -> Optional[Dict[str, Any]]:
+        """This function is a coroutine
+
+        Get the cached metadata for ``key``, looking up the disk
+        store on a memory miss. If ``memory`` is False, only the disk
+        store is used.
+        """
+        data = self.memory.get(key) if memory else None
+        if data is None and self.persistent:
+            data = await asyncio.to_thread(self._load, key)
+            if data is not None and memory:
+                self.memory.put(key, data)
+
+        return data
+
+    async def put(self, key: str, data: Dict[str, Any], /, *, memory: bool = True) -> None:
+        """This function is a coroutine
+
+        Cache the metadata for ``key`` in memory and on disk. If
+        ``memory`` is False, it is only persisted on disk.
+        """
+        if memory:
+            self.memory.put(key, data)
+
+        if self.persistent:
+            await asyncio.to_thread(self._store, key, data)
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import asyncio
+from collections import deque
 from types import TracebackType
-from typing import Any, ClassVar, Coroutine, Dict, List, Optional, Tuple, Type, TYPE_CHECKING
+from typing import Any, ClassVar, Coroutine, Deque, Dict, List, Optional, Set, Tuple, Type, TYPE_CHECKING
 
 import aiohttp
 from yarl import URL
@@ -12,11 +13,16 @@ from shared import SharedInterface
 
 
 __all__ = (
+    "InstanceHealth",
     "YouTubeClient",
 )
 
 
 INVIDIOUS_INSTANCES_URL = URL.build(scheme="https", host="api.invidious.io", path="/instances.json")
+PROBE_TIMEOUT = aiohttp.ClientTimeout(total=3.0)
+RESCORE_INTERVAL = 600.0
+HEDGE_PERCENTILE = 0.95
+HEDGE_DEFAULT_DELAY = 1.0
 VALID_YOUTUBE_HOST = {
     "www.youtube.com",
     "youtube.com",
@@ -47,26 +53,97 @@ class _ResponseContextManager:
             self.response.close()
 
 
+class InstanceHealth:
+    """Exponentially weighted moving averages of the latency and
+    error rate of an Invidious instance.
+    """
+
+    ALPHA: ClassVar[float] = 0.3
+    __slots__ = (
+        "error_rate",
+        "latency",
+        "samples",
+        "url",
+    )
+    if TYPE_CHECKING:
+        error_rate: float
+        latency: Optional[float]
+        samples: Deque[float]
+        url: URL
+
+    def __init__(self, url: URL) -> None:
+        self.error_rate = 0.0
+        self.latency = None
+        self.samples = deque(maxlen=32)
+        self.url = url
+
+    @property
+    def healthy(self) -> bool:
+        return self.latency is not None and self.error_rate < 0.5
+
+    @property
+    def score(self) -> float:
+        """The expected cost of sending a request to this instance, lower is better"""
+        if self.latency is None:
+            return float("inf")
+
+        score = self.latency / max(1.0 - self.error_rate, 0.01)
+        if not self.healthy:
+            score += 10 ** 6
+
+        return score
+
+    def percentile(self, q: float, /) -> Optional[float]:
+        """The ``q``-th quantile of the recent latency samples, or None if there
+        are no samples yet
+        """
+        if not self.samples:
+            return None
+
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def record_success(self, latency: float) -> None:
+        self.samples.append(latency)
+        self.latency = latency if self.latency is None else self.ALPHA * latency + (1 - self.ALPHA) * self.latency
+        self.error_rate *= 1 - self.ALPHA
+
+    def record_failure(self) -> None:
+        self.error_rate = self.ALPHA + (1 - self.ALPHA) * self.error_rate
+
+    def __repr__(self) -> str:
+        return f"<InstanceHealth url={self.url} latency={self.latency} error_rate={self.error_rate:.2f}>"
+
+
 class YouTubeClient:
 
     __instance__: ClassVar[Optional[YouTubeClient]] = None
     __slots__ = (
+        "__closed",
         "__initialized",
         "__ready",
+        "__rescorer",
+        "health",
         "instances",
         "interface",
     )
     if TYPE_CHECKING:
+        __closed: bool
         __initialized: bool
         __ready: asyncio.Event
+        __rescorer: Optional[asyncio.Task[None]]
+        health: Dict[URL, InstanceHealth]
         instances: List[URL]
         interface: SharedInterface
 
     def __new__(cls) -> YouTubeClient:
         if cls.__instance__ is None:
             self = super().__new__(cls)
+            self.__closed = False
             self.__initialized = False
             self.__ready = asyncio.Event()
+            self.__rescorer = None
+            self.health = {}
             self.instances = []
             self.interface = SharedInterface()
 
@@ -102,40 +179,130 @@ class YouTubeClient:
                     if host_name.endswith(".i2p") or host_name.endswith(".onion") or not host_data["api"]:
                         continue
 
-                    self.instances.append(URL.build(scheme="https", host=host_name))
+                    url = URL.build(scheme="https", host=host_name)
+                    self.instances.append(url)
+                    self.health[url] = InstanceHealth(url)
 
             self.interface.log("YouTube client is ready!")
             self.__ready.set()
 
             await self.sort_instances()
+            if not self.__closed:
+                self.__rescorer = asyncio.create_task(self.__rescore())
+
+    def close(self) -> None:
+        """Stop re-scoring the Invidious instances in the background"""
+        self.__closed = True
+        if self.__rescorer is not None:
+            self.__rescorer.cancel()
+            self.__rescorer = None
+
+    async def __rescore(self) -> None:
+        while True:
+            await asyncio.sleep(RESCORE_INTERVAL)
+            await self.sort_instances()
+
+    async def _probe(self, instance: URL) -> None:
+        health = self.health[instance]
+        with TimingContextManager() as measure:
+            try:
+                async with self.session.get(instance, timeout=PROBE_TIMEOUT) as response:
+                    response.raise_for_status()
+            except (asyncio.TimeoutError, aiohttp.ClientError):
+                health.record_failure()
+            else:
+                health.record_success(measure.result)
+
+    def _reorder(self) -> None:
+        self.instances.sort(key=lambda instance: self.health[instance].score)
 
     async def sort_instances(self) -> None:
-        ping: Dict[URL, float] = {}
-        for instance in self.instances:
-            with TimingContextManager() as measure:
-                try:
-                    async with self.session.get(instance) as response:
-                        response.raise_for_status()
-                except (asyncio.TimeoutError, aiohttp.ClientError):
-                    ping[instance] = measure.result + 10 ** 9
-                else:
-                    ping[instance] = measure.result
+        """This function is a coroutine
 
-        self.instances.sort(key=ping.__getitem__)
+        Probe all instances concurrently and reorder them by their
+        health scores.
+        """
+        await asyncio.gather(*[self._probe(instance) for instance in self.instances])
+        self._reorder()
 
-    async def _request(self, method: str, path: str, *, headers: Optional[Dict[str, Any]] = None) -> aiohttp.ClientResponse:
-        await self.wait_until_ready()
-        for instance in self.instances:
+        healthy = sum(health.healthy for health in self.health.values())
+        self.interface.log(f"Probed {len(self.instances)} Invidious instances ({healthy} healthy), best instance: {self.instances[0] if self.instances else None}")
+
+    async def _attempt(self, instance: URL, method: str, path: str, *, headers: Optional[Dict[str, Any]] = None) -> Optional[aiohttp.ClientResponse]:
+        # Make a request to an instance and update its health, return None on failure
+        health = self.health[instance]
+        with TimingContextManager() as measure:
             try:
-                url = instance.with_path(path)
+                url = instance.join(URL(path))
                 response = await self.session.request(method, url, headers=headers)
             except (asyncio.TimeoutError, aiohttp.ClientError):
-                pass
-            else:
+                health.record_failure()
+                self._reorder()
+                return None
+
+        if response.status >= 500:
+            response.close()
+            health.record_failure()
+            self._reorder()
+            return None
+
+        health.record_success(measure.result)
+        self._reorder()
+        return response
+
+    async def _request(self, method: str, path: str, *, headers: Optional[Dict[str, Any]] = None) -> aiohttp.ClientResponse:
+        await self.wait_until_ready()
+        for instance in list(self.instances):  # The list may be reordered while iterating
+            response = await self._attempt(instance, method, path, headers=headers)
+            if response is not None:
                 return response
 
         # Shouldn't reach here
         raise RuntimeError(f"Unable to make request to path {path} of any Invidious instances")
 
-    def get(self, path: str, *, headers: Optional[Dict[str, Any]] = None) -> _ResponseContextManager:
-        return _ResponseContextManager(self._request("GET", path, headers=headers))
+    async def _hedged_request(self, method: str, path: str, *, headers: Optional[Dict[str, Any]] = None) -> aiohttp.ClientResponse:
+        await self.wait_until_ready()
+        instances = iter(list(self.instances))
+        running: Set[asyncio.Task[Optional[aiohttp.ClientResponse]]] = set()
+
+        try:
+            while True:
+                instance = next(instances, None)
+                if instance is not None:
+                    running.add(asyncio.create_task(self._attempt(instance, method, path, headers=headers)))
+
+                    # Wait for a latency percentile of this instance before hedging to the next one
+                    delay = self.health[instance].percentile(HEDGE_PERCENTILE) or HEDGE_DEFAULT_DELAY
+
+                elif not running:
+                    raise RuntimeError(f"Unable to make request to path {path} of any Invidious instances")
+
+                else:
+                    delay = None
+
+                done, running = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    response = task.result()
+                    if response is not None:
+                        # Keep the first valid response, close the others
+                        for other in done:
+                            if other is not task and other.result() is not None:
+                                other.result().close()
+
+                        return response
+
+        finally:
+            for task in running:
+                task.cancel()
+
+            for result in await asyncio.gather(*running, return_exceptions=True):
+                if isinstance(result, aiohttp.ClientResponse):
+                    result.close()
+
+    def get(self, path: str, *, headers: Optional[Dict[str, Any]] = None, hedged: bool = False) -> _ResponseContextManager:
+        """Make a GET request to the best Invidious instance. If ``hedged`` is True, the
+        request is also sent to the next instance once the previous one has been slower
+        than its usual latency, and the first valid response wins.
+        """
+        coro = self._hedged_request if hedged else self._request
+        return _ResponseContextManager(coro("GET", path, headers=headers))
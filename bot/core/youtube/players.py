@@ -3,13 +3,16 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import shlex
-from random import randint
-from typing import Any, Optional, Union, TYPE_CHECKING
+import time
+from typing import Any, Optional, Tuple, Union, TYPE_CHECKING
 
 import discord
 
-from global_utils import format_exception
+from global_utils import TimingContextManager, format_exception
+from metrics import ProcessUsage, voice_telemetry
+from .audio_cache import AUDIO_CACHE_VOLUME, AudioCache
 from .playlists import Playlist
+from .queues import TrackQueue
 from .tracks import Track
 if TYPE_CHECKING:
     from haruka import Haruka
@@ -20,6 +23,55 @@ __all__ = (
 )
 
 
+MAX_ADVANCE_ATTEMPTS = 3
+MAX_VOLUME = 2.0
+FRAME_DURATION = 0.02  # discord.py reads one 20ms Opus frame at a time
+
+
+class _TrackedOpusAudio(discord.FFmpegOpusAudio):
+    """An ``FFmpegOpusAudio`` which counts the audio packets read from FFmpeg
+    and records playback telemetry
+    """
+
+    if TYPE_CHECKING:
+        _process: Any
+        first_read: Optional[float]
+        packets: int
+        started: float
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.started = time.perf_counter()
+        super().__init__(*args, **kwargs)
+        self.first_read = None
+        self.packets = 0
+
+    def read(self) -> bytes:
+        # Called from the audio player thread
+        start = time.perf_counter()
+        if self.first_read is None:
+            # FFmpeg is spawned before the player starts reading, measure the latency from playback start instead
+            self.first_read = start
+
+        data = super().read()
+        end = time.perf_counter()
+        if data:
+            if self.packets == 0:
+                voice_telemetry.first_packet_latency.observe(end - self.first_read)
+            elif end - start > FRAME_DURATION:
+                voice_telemetry.underruns += 1
+
+            self.packets += 1
+
+        return data
+
+    def process_usage(self) -> Optional[ProcessUsage]:
+        process = getattr(self, "_process", None)
+        if process is None or process.poll() is not None:
+            return None
+
+        return ProcessUsage.read(process.pid, started=self.started)
+
+
 class AudioPlayer(discord.VoiceClient):
     """A voice client which is able to play audio within
     a voice channel.
@@ -30,24 +82,26 @@ class AudioPlayer(discord.VoiceClient):
     __slots__ = (
         "__operable",
         "__play_lock",
+        "__prefetched",
         "__repeat",
-        "__shuffle",
         "__stop_request",
         "__waiter",
         "bitrate",
-        "playing",
+        "queue",
         "target",
+        "volume",
     )
     if TYPE_CHECKING:
         __operable: asyncio.Event
         __play_lock: asyncio.Lock
+        __prefetched: Optional[Tuple[Track, asyncio.Task[str]]]
         __repeat: bool
-        __shuffle: bool
         __stop_request: bool
         __waiter: asyncio.Event
         bitrate: int
-        playing: Optional[Union[Playlist, Track]]
+        queue: TrackQueue
         target: Optional[discord.abc.Messageable]
+        volume: float
 
         # Override types from superclass
         channel: discord.VoiceChannel
@@ -57,13 +111,14 @@ class AudioPlayer(discord.VoiceClient):
         super().__init__(client, channel)
         self.__play_lock = asyncio.Lock()
         self.__operable = asyncio.Event()
+        self.__prefetched = None
         self.__repeat = False
-        self.__shuffle = False
         self.__stop_request = False
         self.__waiter = asyncio.Event()
         self.bitrate = 128
-        self.playing = None
+        self.queue = TrackQueue()
         self.target = None
+        self.volume = 1.0
 
     @property
     def repeat(self) -> bool:
@@ -73,20 +128,48 @@ class AudioPlayer(discord.VoiceClient):
     @property
     def shuffle(self) -> bool:
         """The current SHUFFLE mode"""
-        return self.__shuffle
+        return self.queue.shuffle
+
+    @property
+    def active(self) -> bool:
+        """Whether the player is currently playing the queue"""
+        return self.__play_lock.locked()
+
+    def is_listening(self, member: Union[discord.Member, discord.User]) -> bool:
+        """Whether ``member`` is in the voice channel of this player"""
+        voice = getattr(member, "voice", None)
+        return voice is not None and voice.channel == self.channel
 
     def switch_repeat(self) -> None:
         self.__repeat = not self.__repeat
 
     def switch_shuffle(self) -> None:
-        self.__shuffle = not self.__shuffle
+        self.queue.set_shuffle(not self.queue.shuffle)
+
+    def enqueue(self, source: Union[Playlist, Track]) -> int:
+        """Add an audio source to the end of the queue
 
-    def set_source(self, source: Union[Playlist, Track]) -> None:
-        """Set an audio source to be ready for playing"""
-        if not isinstance(source, (Playlist, Track)):
-            raise TypeError(f"Expected a Playlist or Track to be set, not {source.__class__.__name__}")
+        Returns
+        -----
+        ``int``
+            The queue index of the first added track
+        """
+        return self.queue.enqueue(source)
+
+    def process_usage(self) -> Optional[ProcessUsage]:
+        """The resource usage of the FFmpeg process of the current track"""
+        source = self.source
+        if isinstance(source, _TrackedOpusAudio):
+            return source.process_usage()
+
+    def set_volume(self, volume: float) -> None:
+        """Set the playback volume, relative to the default volume. The new
+        volume applies from the next track.
+        """
+        if not 0.0 <= volume <= MAX_VOLUME:
+            raise ValueError(f"Volume must be between 0 and {MAX_VOLUME}, not {volume}")
 
-        self.playing = source
+        self.volume = volume
 
     def set_target(self, target: discord.abc.Messageable) -> None:
         if not isinstance(target, discord.abc.Messageable):
@@ -99,13 +182,17 @@ class AudioPlayer(discord.VoiceClient):
             name="Bitrate",
             value=f"{self.bitrate} kbps",
         )
+        embed.add_field(
+            name="Volume",
+            value=f"{self.volume:.0%}",
+        )
         embed.add_field(
             name="`REPEAT` mode",
             value=self.__repeat,
         )
         embed.add_field(
             name="`SHUFFLE` mode",
-            value=self.__shuffle,
+            value=self.queue.shuffle,
         )
 
     async def notify(self, content: Optional[str] = None, **kwargs: Any) -> Optional[discord.Message]:
@@ -115,65 +202,110 @@ class AudioPlayer(discord.VoiceClient):
     async def play(self) -> None:
         """This function is a coroutine
 
-        Play audio of the current playlist or track. If the current source
-        is a playlist, play it according to the current REPEAT or SHUFFLE
-        mode. If the current source is a track, play it repeatedly regardless
-        of the aforementioned modes.
+        Play the tracks in the queue in cycles, according to the current
+        REPEAT or SHUFFLE mode.
 
         This function returns when the audio finishes playing.
 
         Raises
         -----
-        `ValueError`: The set playlist is empty
-
-        `TypeError`: No audio source was set or the audio source is invalid
+        `ValueError`: The queue is empty
         """
         async with self.__play_lock:
-            source = self.playing
-            if source is None:
-                raise RuntimeError("No audio source was set")
-
-            if isinstance(source, Playlist):
-                tracks = source.tracks
-                if not tracks:
-                    raise ValueError("The provided playlist is empty")
-
-                await self.notify(embed=await source.create_embed(self.client))
-
-                index = 0
-                self.__stop_request = False
-                while self.is_connected() and not self.__stop_request:
-                    await self.__play_track(tracks[index])
-                    if not self.__repeat:
-                        if self.__shuffle:
-                            index += randint(0, len(tracks) - 1)
-                        else:
-                            index += 1
-
-                        index %= len(tracks)
-
-            elif isinstance(source, Track):
-                self.__stop_request = False
-                while self.is_connected() and not self.__stop_request:
-                    await self.__play_track(source)
+            if not self.queue:
+                raise ValueError("The queue is empty")
+
+            self.__stop_request = False
+            track = await self.__advance()
+            while track is not None and self.is_connected() and not self.__stop_request:
+                # Decide the next track in advance so that its audio URL can be prefetched
+                if self.__repeat:
+                    next_track = track
+                else:
+                    try:
+                        upcoming = await self.queue.upcoming(1)
+                    except Exception:
+                        upcoming = []
+
+                    next_track = upcoming[0] if upcoming else None
+
+                await self.__play_track(track, next_track=next_track)
+
+                if not self.__repeat:
+                    track = await self.__advance()
+
+    async def __advance(self) -> Optional[Track]:
+        # Move to the next track in the queue, skipping tracks whose playlist page cannot be fetched
+        for _ in range(MAX_ADVANCE_ATTEMPTS):
+            try:
+                return await self.queue.advance()
+            except Exception as exc:
+                self.client.log("Unable to get the next track in the queue\n" + format_exception(exc))
+
+        await self.client.report_error(f"Unable to get the next track in the queue after {MAX_ADVANCE_ATTEMPTS} attempts")
+        await self.notify("Unable to load the next tracks, stopping.")
+
+    def __prefetch(self, track: Track) -> None:
+        if AudioCache().get(track) is not None:
+            return
+
+        if self.__prefetched is not None:
+            if self.__prefetched[0] is track:
+                return
 
-            else:
-                raise TypeError(f"Expected a Playlist or Track to be set, not {source.__class__.__name__}")
+            self.__cancel_prefetch()
 
-    async def __play_track(self, track: Track) -> None:
-        embed = await track.create_embed(self.client)
-        try:
-            audio_url = await track.get_audio_url()
-        except Exception as exc:
-            self.client.log(f"Unable to get audio URL for {track}\n" + format_exception(exc))
+        task = asyncio.create_task(track.get_audio_url())
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())  # Mark the exception as retrieved
+        self.__prefetched = (track, task)
 
-            await self.client.report(f"Unable to get audio URL for track ID `{track.id}`", send_state=False)
-            await self.notify("Unable to play this track, skipping.", embed=embed)
+    def __cancel_prefetch(self) -> None:
+        if self.__prefetched is not None:
+            self.__prefetched[1].cancel()
+            self.__prefetched = None
+
+    async def __get_audio_url(self, track: Track) -> str:
+        if self.__prefetched is not None and self.__prefetched[0] is track:
+            _, task = self.__prefetched
+            self.__prefetched = None
+            return await task
+
+        self.__cancel_prefetch()
+        return await track.get_audio_url()
+
+    async def __play_track(self, track: Track, *, next_track: Optional[Track] = None) -> None:
+        embed = await track.create_embed(self.client)
+        cache = AudioCache()
+        cached = cache.get(track)
+        if cached is not None:
+            if self.volume == 1.0:
+                # Cached files are already Opus at the default volume, "opus" makes FFmpegOpusAudio copy the packets instead of re-encoding
+                source = _TrackedOpusAudio(
+                    str(cached),
+                    codec="opus",
+                    stderr=self.client.interface.logfile,
+                    options="-vn",
+                )
+            else:
+                source = _TrackedOpusAudio(
+                    str(cached),
+                    bitrate=self.bitrate,
+                    stderr=self.client.interface.logfile,
+                    options=shlex.join(("-vn", "-filter:a", f"volume={self.volume}")),
+                )
         else:
-            def after(error: Optional[Exception]) -> None:
-                self.__waiter.set()
-                if error is not None:
-                    self.client.log(format_exception(error))
+            try:
+                with TimingContextManager() as measure:
+                    audio_url = await self.__get_audio_url(track)
+
+                voice_telemetry.audio_url_latency.observe(measure.result)
+            except Exception as exc:
+                voice_telemetry.audio_url_errors += 1
+                self.client.log(f"Unable to get audio URL for {track}\n" + format_exception(exc))
+
+                await self.client.report_error(f"Unable to get audio URL for track ID `{track.id}`", error=exc)
+                await self.notify("Unable to play this track, skipping.", embed=embed)
+                return
 
             before_options = (
                 "-start_at_zero",
@@ -183,13 +315,10 @@ class AudioPlayer(discord.VoiceClient):
             )
             options = (
                 "-vn",
-                "-filter:a", "volume=0.2",
+                "-filter:a", f"volume={AUDIO_CACHE_VOLUME * self.volume}",
             )
 
-            if self.target is not None:
-                await self.target.typing()
-
-            source = discord.FFmpegOpusAudio(
+            source = _TrackedOpusAudio(
                 audio_url,
                 bitrate=self.bitrate,
                 stderr=self.client.interface.logfile,
@@ -197,19 +326,47 @@ class AudioPlayer(discord.VoiceClient):
                 options=shlex.join(options),
             )
 
-            embed.add_field(name="Playing in", value=self.channel.mention)
-            await self.notify(embed=embed)
+            # Tracks which are played again get cached, so that their next plays do not need to be re-encoded
+            cache.schedule_download(track, audio_url)
 
-            if self.__stop_request or not self.is_connected():
-                return
+        def after(error: Optional[Exception]) -> None:
+            self.__waiter.set()
+            if error is not None:
+                voice_telemetry.playback_errors += 1
+                self.client.log(format_exception(error))
+
+            if source.packets == 0:
+                voice_telemetry.empty_streams += 1
+
+            if cached is None and (error is not None or source.packets == 0):
+                # FFmpeg was unable to open the URL, it may have expired
+                track.invalidate_audio_url()
+
+        if self.target is not None:
+            await self.target.typing()
+
+        embed.add_field(name="Playing in", value=self.channel.mention)
+        await self.notify(embed=embed)
+
+        if self.__stop_request or not self.is_connected():
+            source.cleanup()
+            return
+
+        # Resolve the audio URL of the next track while this one is playing
+        if next_track is not None and next_track is not track:
+            self.__prefetch(next_track)
+
+        self.__waiter.clear()
+        self.__operable.set()
 
-            self.__waiter.clear()
-            self.__operable.set()
+        voice_telemetry.tracks_played += 1
+        if cached is not None:
+            voice_telemetry.cached_plays += 1
 
-            super().play(source, after=after)
-            await self.__waiter.wait()
+        super().play(source, after=after)
+        await self.__waiter.wait()
 
-            self.__operable.clear()
+        self.__operable.clear()
 
     async def pause(self) -> None:
         await self.__operable.wait()
@@ -227,4 +384,5 @@ class AudioPlayer(discord.VoiceClient):
 
     def stop(self) -> None:
         self.__stop_request = True
+        self.__cancel_prefetch()
         super().stop()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
 from typing import Any, Dict, Optional, List, Union, TYPE_CHECKING
 
@@ -7,7 +8,9 @@ import discord
 from discord.utils import escape_markdown
 from yarl import URL
 
+from caches import LRUCache
 from global_utils import slice_string
+from .cache import MetadataCache
 from .client import YouTubeClient, VALID_YOUTUBE_HOST
 from .tracks import Track
 if TYPE_CHECKING:
@@ -19,28 +22,132 @@ __all__ = (
 )
 
 
+PLAYLIST_PAGE_SIZE = 100  # Invidious returns up to 100 videos per page
+PLAYLIST_PREVIEW_SIZE = 7
+PLAYLIST_WINDOW_PAGES = 3
+
+
 class Playlist:
+    """A YouTube playlist whose tracks are fetched page by page on
+    demand.
+
+    Only the most recently used ``PLAYLIST_WINDOW_PAGES`` pages of
+    tracks are kept in memory. Invidious omits unavailable videos from
+    the pages while still counting them in ``videoCount``, so tracks
+    are mapped by their own index within the playlist and unavailable
+    slots are left empty.
+    """
 
     __slots__ = (
+        "__fetching",
+        "__pages",
         "title",
         "id",
         "author",
         "description",
-        "tracks",
+        "count",
+        "page_size",
+        "preview",
     )
     if TYPE_CHECKING:
+        __fetching: Dict[int, asyncio.Task[Dict[int, Track]]]
+        __pages: LRUCache[int, Dict[int, Track]]
         title: str
         id: str
         author: str
         description: str
-        tracks: List[Track]
+        count: int
+        page_size: int
+        preview: Dict[int, Track]
 
     def __init__(self, data: Dict[str, Any]) -> None:
         self.title = data["title"]
         self.id = data["playlistId"]
         self.author = data["author"]
         self.description = data["description"]
-        self.tracks = [Track(d) for d in data["videos"]]
+
+        videos = data["videos"]
+        self.count = data.get("videoCount", len(videos))
+        self.page_size = max(len(videos), PLAYLIST_PAGE_SIZE)
+
+        first_page = self.__map_page(1, videos)
+        self.preview = {index: first_page[index] for index in sorted(first_page)[:PLAYLIST_PREVIEW_SIZE]}
+
+        self.__fetching = {}
+        self.__pages = LRUCache(maxsize=PLAYLIST_WINDOW_PAGES)
+        self.__pages.put(1, first_page)
+
+    def to_data(self) -> Dict[str, Any]:
+        """Return the minimal data to reconstruct this playlist"""
+        return {
+            "title": self.title,
+            "playlistId": self.id,
+            "author": self.author,
+            "description": self.description,
+            "videoCount": self.count,
+            "videos": self.__unmap_page(self.__pages.get(1) or self.preview),
+        }
+
+    def __map_page(self, page: int, videos: List[Dict[str, Any]]) -> Dict[int, Track]:
+        # Older cached data has no "index" field, assume its videos are contiguous
+        start = (page - 1) * self.page_size
+        return {d.get("index", start + position): Track(d) for position, d in enumerate(videos)}
+
+    @staticmethod
+    def __unmap_page(tracks: Dict[int, Track]) -> List[Dict[str, Any]]:
+        return [dict(tracks[index].to_data(), index=index) for index in sorted(tracks)]
+
+    async def get_track(self, index: int, /) -> Optional[Track]:
+        """This function is a coroutine
+
+        Get the track at ``index`` within this playlist, fetching its
+        page if necessary.
+
+        Returns
+        -----
+        Optional[``Track``]
+            The track at ``index``, or None if the video is unavailable
+
+        Raises
+        -----
+        `IndexError`: The index is out of range
+        """
+        if not 0 <= index < self.count:
+            raise IndexError(f"Track index {index} is out of range for a playlist of {self.count} tracks")
+
+        tracks = await self.__get_page(index // self.page_size + 1)
+        return tracks.get(index)
+
+    async def __get_page(self, page: int) -> Dict[int, Track]:
+        tracks = self.__pages.get(page)
+        if tracks is not None:
+            return tracks
+
+        try:
+            task = self.__fetching[page]
+        except KeyError:
+            task = self.__fetching[page] = asyncio.create_task(self.__fetch_page(page))
+            task.add_done_callback(lambda _: self.__fetching.pop(page, None))
+
+        return await asyncio.shield(task)
+
+    async def __fetch_page(self, page: int) -> Dict[int, Track]:
+        # Pages are only persisted on disk, the memory tier would keep them for much longer than the sliding window
+        key = f"playlist:{self.id}:{page}"
+        cache = MetadataCache()
+        data = await cache.get(key, memory=False)
+        if data is None:
+            client = YouTubeClient()
+            async with client.get(f"/api/v1/playlists/{self.id}?page={page}", hedged=True) as response:
+                response.raise_for_status()
+                data = await response.json(encoding="utf-8")
+
+            data = {"videos": self.__unmap_page(self.__map_page(page, data["videos"]))}
+            await cache.put(key, data, memory=False)
+
+        tracks = self.__map_page(page, data["videos"])
+        self.__pages.put(page, tracks)
+        return tracks
 
     @property
     def url(self) -> URL:
@@ -53,31 +160,38 @@ class Playlist:
             url=self.url,
         )
 
-        track_display = "\n".join(f"**#{index + 1}** [{track.title}]({track.url})" for index, track in enumerate(self.tracks[:7]))
-        if len(self.tracks) > 7:
-            track_display += f"\n... and {len(self.tracks) - 7} more"
+        track_display = "\n".join(f"**#{index + 1}** [{track.title}]({track.url})" for index, track in self.preview.items())
+        if self.count > len(self.preview):
+            track_display += f"\n... and {self.count - len(self.preview)} more"
 
         embed.add_field(
-            name=f"Tracks ({len(self.tracks)})",
+            name=f"Tracks ({self.count})",
             value=track_display,
             inline=False,
         )
         embed.set_author(name=self.author, icon_url=bot.user.display_avatar.url)
 
-        if not self.tracks:
+        if not self.preview:
             embed.set_thumbnail(url=bot.user.display_avatar.url)
         else:
-            embed.set_thumbnail(url=self.tracks[0].thumbnail_url)
+            embed.set_thumbnail(url=next(iter(self.preview.values())).thumbnail_url)
 
         return embed
 
     @classmethod
     async def from_id(cls, id: str) -> Optional[Playlist]:
+        cache = MetadataCache()
+        data = await cache.get(f"playlist:{id}")
+        if data is not None:
+            return cls(data)
+
         client = YouTubeClient()
-        async with client.get(f"/api/v1/playlists/{id}") as response:
+        async with client.get(f"/api/v1/playlists/{id}", hedged=True) as response:
             if response.status == 200:
                 data = await response.json(encoding="utf-8")
-                return cls(data)
+                playlist = cls(data)
+                await cache.put(f"playlist:{id}", playlist.to_data())
+                return playlist
 
     @classmethod
     async def from_url(cls, url: Union[str, URL]) -> Optional[Playlist]:
@@ -89,4 +203,4 @@ class Playlist:
             return await cls.from_id(url.query["list"])
 
     def __repr__(self) -> str:
-        return f"<Playlist title={self.title!r} id={self.id!r} author={self.author!r}>"
+        return f"<Playlist title={self.title!r} id={self.id!r} author={self.author!r} count={self.count}>"
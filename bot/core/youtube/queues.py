@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import random
+from array import array
+from typing import List, Optional, Tuple, Union, TYPE_CHECKING
+
+from .playlists import Playlist
+from .tracks import Track
+
+
+__all__ = (
+    "TrackQueue",
+)
+
+
+def _length(source: Union[Playlist, Track]) -> int:
+    if isinstance(source, Playlist):
+        return source.count
+
+    return 1
+
+
+def _permutation(length: int, *, avoid_first: Optional[int] = None) -> array[int]:
+    # Fisher-Yates shuffle of range(length), the first element is never avoid_first (if possible)
+    order = array("L", range(length))
+    for i in range(length - 1, 0, -1):
+        j = random.randint(0, i)
+        order[i], order[j] = order[j], order[i]
+
+    if length > 1 and order[0] == avoid_first:
+        j = random.randint(1, length - 1)
+        order[0], order[j] = order[j], order[0]
+
+    return order
+
+
+class TrackQueue:
+    """A queue of playlists and tracks which is played in cycles.
+
+    Tracks are addressed by their index within the concatenation of
+    all sources, so that the tracks of playlists are never copied. In
+    SHUFFLE mode, each cycle follows a random permutation of these
+    indices, which is generated lazily when the previous cycle ends.
+    """
+
+    __slots__ = (
+        "__items",
+        "__next_order",
+        "__offsets",
+        "__order",
+        "__position",
+    )
+    if TYPE_CHECKING:
+        __items: List[Union[Playlist, Track]]
+        __next_order: Optional[array[int]]
+        __offsets: List[int]
+        __order: Optional[array[int]]
+        __position: int
+
+    def __init__(self) -> None:
+        self.__items = []
+        self.__next_order = None
+        self.__offsets = [0]
+        self.__order = None
+        self.__position = -1
+
+    def __len__(self) -> int:
+        """The total number of tracks in the queue"""
+        return self.__offsets[-1]
+
+    @property
+    def sources(self) -> Tuple[Union[Playlist, Track], ...]:
+        return tuple(self.__items)
+
+    @property
+    def shuffle(self) -> bool:
+        return self.__order is not None
+
+    @property
+    def current_index(self) -> Optional[int]:
+        """The index of the current track, or None if the queue has not
+        started yet
+        """
+        if self.__position < 0:
+            return None
+
+        return self.__index_at(self.__position)
+
+    def __index_at(self, position: int) -> int:
+        if self.__order is None:
+            return position % len(self)
+
+        if position < len(self.__order):
+            return self.__order[position]
+
+        if self.__next_order is None:
+            self.__next_order = _permutation(len(self), avoid_first=self.__order[-1] if self.__order else None)
+
+        return self.__next_order[position - len(self.__order)]
+
+    async def get_track(self, index: int, /) -> Optional[Track]:
+        """This function is a coroutine
+
+        Get the track at ``index`` within the queue, fetching it from
+        its playlist if necessary. Returns None if the track is an
+        unavailable playlist video.
+        """
+        item = bisect.bisect_right(self.__offsets, index) - 1
+        source = self.__items[item]
+        if isinstance(source, Playlist):
+            return await source.get_track(index - self.__offsets[item])
+
+        return source
+
+    async def current(self) -> Optional[Track]:
+        """This function is a coroutine
+
+        Get the current track, or None if the queue has not started yet.
+        """
+        index = self.current_index
+        if index is None:
+            return None
+
+        return await self.get_track(index)
+
+    async def upcoming(self, count: int, /) -> List[Track]:
+        """This function is a coroutine
+
+        Get the next ``count`` tracks to be played, skipping unavailable
+        playlist videos. The playlist pages holding them are fetched
+        concurrently.
+        """
+        tracks: List[Track] = []
+        length = len(self)
+        offset = 1
+        while len(tracks) < count and offset <= length:
+            stop = min(offset + count - len(tracks), length + 1)
+            indices = [self.__index_at(self.__position + position) for position in range(offset, stop)]
+            offset = stop
+
+            # Playlists share a single fetch between concurrent requests for the same page
+            for track in await asyncio.gather(*(self.get_track(index) for index in indices)):
+                if track is not None:
+                    tracks.append(track)
+
+        return tracks
+
+    async def advance(self) -> Optional[Track]:
+        """This function is a coroutine
+
+        Move to the next available track and return it, or return None
+        if the queue has no available tracks.
+        """
+        length = len(self)
+        for _ in range(length):
+            self.__position += 1
+            if self.__order is None:
+                self.__position %= length
+
+            elif self.__position >= len(self.__order):
+                if self.__next_order is None:
+                    self.__next_order = _permutation(length, avoid_first=self.__order[-1] if self.__order else None)
+
+                self.__order = self.__next_order
+                self.__next_order = None
+                self.__position = 0
+
+            track = await self.get_track(self.__index_at(self.__position))
+            if track is not None:
+                return track
+
+        return None
+
+    def set_shuffle(self, shuffle: bool, /) -> None:
+        current = self.current_index
+        if shuffle:
+            self.__order = _permutation(len(self))
+            if current is not None:
+                # Continue the new cycle from the current track
+                position = self.__order.index(current)
+                self.__order[0], self.__order[position] = self.__order[position], self.__order[0]
+                self.__position = 0
+
+        else:
+            self.__order = None
+            self.__position = -1 if current is None else current
+
+        self.__next_order = None
+
+    def enqueue(self, source: Union[Playlist, Track], /) -> int:
+        """Add a playlist or track to the end of the queue
+
+        Returns
+        -----
+        ``int``
+            The index of the first added track
+        """
+        if not isinstance(source, (Playlist, Track)):
+            raise TypeError(f"Expected a Playlist or Track to be enqueued, not {source.__class__.__name__}")
+
+        start = len(self)
+        self.__items.append(source)
+        self.__offsets.append(start + _length(source))
+
+        if self.__order is not None:
+            # Shuffle the new tracks into the remaining part of the current cycle
+            for index in range(start, len(self)):
+                self.__order.append(index)
+                position = random.randint(self.__position + 1, len(self.__order) - 1)
+                self.__order[-1], self.__order[position] = self.__order[position], self.__order[-1]
+
+            self.__next_order = None
+
+        return start
+
+    def dequeue(self) -> Union[Playlist, Track]:
+        """Remove and return the first playlist or track in the queue"""
+        return self.remove(0)
+
+    def remove(self, item: int, /) -> Union[Playlist, Track]:
+        """Remove and return the playlist or track at position ``item``
+        in ``sources``.
+
+        If the current track is removed, the queue continues with the
+        track following the removed source.
+        """
+        start, stop = self.__offsets[item], self.__offsets[item + 1]
+        current = self.current_index
+        source = self.__items.pop(item)
+        self.__offsets = [0]
+        for other in self.__items:
+            self.__offsets.append(self.__offsets[-1] + _length(other))
+
+        removed_current = current is not None and start <= current < stop
+        if current is not None:
+            if current >= stop:
+                current -= stop - start
+            elif removed_current:
+                current = start - 1
+
+        if self.__order is not None:
+            # Indices were shifted, start a new cycle from the current track
+            self.__order = _permutation(len(self))
+            self.__next_order = None
+            self.__position = -1
+            if current is not None and not removed_current:
+                position = self.__order.index(current)
+                self.__order[0], self.__order[position] = self.__order[position], self.__order[0]
+                self.__position = 0
+
+        elif current is not None:
+            self.__position = current
+
+        if not self.__items:
+            self.__position = -1
+
+        return source
+
+    def clear(self) -> None:
+        self.__items.clear()
+        self.__offsets = [0]
+        if self.__order is not None:
+            self.__order = array("L")
+
+        self.__next_order = None
+        self.__position = -1
+
+    def __repr__(self) -> str:
+        return f"<TrackQueue sources={len(self.__items)} tracks={len(self)} shuffle={self.shuffle}>"
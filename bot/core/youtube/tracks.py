@@ -1,13 +1,15 @@
 from __future__ import annotations
 
 import contextlib
-from typing import Any, ClassVar, Dict, Literal, Optional, Union, TYPE_CHECKING
+from typing import Any, ClassVar, Dict, Literal, Optional, Tuple, Union, TYPE_CHECKING
 
 import discord
 from discord.utils import escape_markdown
 from yarl import URL
 
+from caches import TTLCache
 from global_utils import format, retry
+from .cache import MetadataCache
 from .client import YouTubeClient, VALID_YOUTUBE_HOST
 if TYPE_CHECKING:
     from haruka import Haruka
@@ -18,6 +20,11 @@ __all__ = (
 )
 
 
+AUDIO_URL_TTL = 1800.0  # Download links from y2mate expire after a while
+AudioFormat = Literal["64", "96", "140", "192", "256", "320", "mp3128"]
+audio_url_cache: TTLCache[Tuple[str, str], str] = TTLCache(maxsize=1000, ttl=AUDIO_URL_TTL)
+
+
 class Track:
 
     _analyzer: ClassVar[URL] = URL.build(scheme="https", host="www.y2mate.com", path="/mates/analyzeV2/ajax")
@@ -43,6 +50,16 @@ class Track:
         self.author_url = URL.build(scheme="https", host="youtube.com", path=data["authorUrl"])
         self.length = data["lengthSeconds"]
 
+    def to_data(self) -> Dict[str, Any]:
+        """Return the minimal data to reconstruct this track"""
+        return {
+            "title": self.title,
+            "videoId": self.id,
+            "author": self.author,
+            "authorUrl": self.author_url.path,
+            "lengthSeconds": self.length,
+        }
+
     @property
     def url(self) -> URL:
         return URL.build(scheme="https", host="youtube.com", path="/watch", query={"v": self.id})
@@ -59,8 +76,26 @@ class Track:
 
         return embed
 
+    async def get_audio_url(self, *, audio_format: AudioFormat = "mp3128") -> str:
+        """This function is a coroutine
+
+        Get a download URL of this track's audio. Resolved URLs are cached
+        until they expire or are invalidated via ``invalidate_audio_url``.
+        """
+        key = (self.id, audio_format)
+        audio_url = audio_url_cache.get(key)
+        if audio_url is None:
+            audio_url = await self._resolve_audio_url(audio_format=audio_format)
+            audio_url_cache.put(key, audio_url)
+
+        return audio_url
+
+    def invalidate_audio_url(self, *, audio_format: AudioFormat = "mp3128") -> None:
+        """Remove the cached audio URL of this track, e.g. when it cannot be opened"""
+        audio_url_cache.pop((self.id, audio_format))
+
     @retry(2)
-    async def get_audio_url(self, *, audio_format: Literal["64", "96", "140", "192", "256", "320", "mp3128"] = "mp3128") -> str:
+    async def _resolve_audio_url(self, *, audio_format: AudioFormat) -> str:
         client = YouTubeClient()
         payload = {
             "k_query": str(self.url),
@@ -86,11 +121,18 @@ class Track:
 
     @classmethod
     async def from_id(cls, id: str) -> Optional[Track]:
+        cache = MetadataCache()
+        data = await cache.get(f"video:{id}")
+        if data is not None:
+            return cls(data)
+
         client = YouTubeClient()
-        async with client.get(f"/api/v1/videos/{id}") as response:
+        async with client.get(f"/api/v1/videos/{id}", hedged=True) as response:
             if response.status == 200:
                 data = await response.json(encoding="utf-8")
-                return cls(data)
+                track = cls(data)
+                await cache.put(f"video:{id}", track.to_data())
+                return track
 
     @classmethod
     async def from_url(cls, url: Union[str, URL]) -> Optional[Track]:
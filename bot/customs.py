@@ -94,6 +94,9 @@ if TYPE_CHECKING:
         async def fetchall(self) -> List[Row]:
             ...
 
+        async def nextset(self) -> Optional[bool]:
+            ...
+
     class Connection(aioodbc.Connection):
         def cursor(self) -> _AsyncContextManager[Cursor]:
             ...
@@ -5,6 +5,14 @@ import discord
 
 INVITE_URL = r"https://discord.com/api/oauth2/authorize?client_id=848178172536946708&permissions=70643008&scope=bot%20applications.commands"
 DEFAULT_COMMAND_PREFIX = "$"
+PREFIX_MAX_LENGTH = 50  # Must match the prefix column size, see migrations.py
+PREFIX_CACHE_SIZE = 10000
+BLACKLIST_REFRESH_INTERVAL = 1800.0  # Set to None to disable periodic refresh
+TOKEN_CACHE_SIZE = 1000
+TOKEN_CACHE_TTL = 3600.0
+TRANSFERABLE_CONTEXT_CACHE_SIZE = 1000
+TRANSFERABLE_CONTEXT_WINDOW = 600.0
+PROCESSED_MESSAGE_WINDOW = 600.0
 OWNER_ID = 618361466248232960
 
 
@@ -19,7 +27,14 @@ PORT = int(os.environ["PORT"])
 
 BASH_PATH = "./bash.txt"
 LOG_PATH = "./log.txt"
-FUZZY_MATCH = "./bot/c++/fuzzy.out"
+LOG_FLUSH_INTERVAL = 1.0
+LOG_FLUSH_SIZE = 64 * 1024
+LOG_MAX_SIZE = 16 * 1024 * 1024
+LOG_MAX_BUFFER_SIZE = 16 * 1024 * 1024
+LOG_TAIL_SIZE = 256 * 1024
+REPORT_COALESCE_WINDOW = 60.0
+REPORT_RATE_LIMIT_CAPACITY = 5
+REPORT_RATE_LIMIT_RATE = 1 / 60  # Tokens per second
 
 
 C_EVAL_PATH = "./cppeval.txt"
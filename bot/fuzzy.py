@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+
+__all__ = (
+    "levenshtein",
+    "FuzzyMatcher",
+)
+
+
+def levenshtein(first: str, second: str, /) -> int:
+    """Compute the Levenshtein distance between 2 strings using
+    O(min(n, m)) memory.
+    """
+    if len(first) < len(second):
+        first, second = second, first
+
+    if not second:
+        return len(first)
+
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, start=1):
+        current = [i]
+        for j, second_char in enumerate(second, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (first_char != second_char),
+                ),
+            )
+
+        previous = current
+
+    return previous[-1]
+
+
+class _Node:
+
+    __slots__ = (
+        "children",
+        "index",
+        "word",
+    )
+    if TYPE_CHECKING:
+        children: Dict[int, _Node]
+        index: int
+        word: str
+
+    def __init__(self, word: str, index: int) -> None:
+        self.children = {}
+        self.index = index
+        self.word = word
+
+
+class FuzzyMatcher:
+    """A BK-tree index over a fixed collection of words, supporting
+    nearest-neighbour queries under the Levenshtein distance.
+
+    When several words are equally close to a query, the one added
+    first wins.
+    """
+
+    __slots__ = (
+        "__root",
+        "__size",
+    )
+    if TYPE_CHECKING:
+        __root: Optional[_Node]
+        __size: int
+
+    def __init__(self, words: Iterable[str] = ()) -> None:
+        self.__root = None
+        self.__size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str, /) -> None:
+        if self.__root is None:
+            self.__root = _Node(word, self.__size)
+            self.__size += 1
+            return
+
+        node = self.__root
+        while True:
+            distance = levenshtein(word, node.word)
+            if distance == 0:
+                return
+
+            try:
+                node = node.children[distance]
+            except KeyError:
+                node.children[distance] = _Node(word, self.__size)
+                self.__size += 1
+                return
+
+    def search(self, query: str, /, *, k: int = 1, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Find the words closest to ``query``
+
+        Parameters
+        -----
+        query: ``str``
+            The string to search for
+        k: ``int``
+            The maximum number of results
+        max_distance: Optional[``int``]
+            If specified, ignore words farther than this distance
+
+        Returns
+        -----
+        List[Tuple[``str``, ``int``]]
+            At most ``k`` pairs of (word, distance), sorted by distance
+        """
+        if self.__root is None or k <= 0:
+            return []
+
+        # Max-heap (via negated keys) of the best k candidates found so far
+        best: List[Tuple[int, int, str]] = []
+        stack = [self.__root]
+        while stack:
+            node = stack.pop()
+            distance = levenshtein(query, node.word)
+            threshold = max_distance
+            if len(best) == k:
+                threshold = -best[0][0] if threshold is None else min(threshold, -best[0][0])
+
+            if threshold is None or distance <= threshold:
+                item = (-distance, -node.index, node.word)
+                if len(best) < k:
+                    heapq.heappush(best, item)
+                elif item > best[0]:
+                    heapq.heapreplace(best, item)
+
+                if len(best) == k:
+                    threshold = -best[0][0] if max_distance is None else min(max_distance, -best[0][0])
+
+            for edge, child in node.children.items():
+                if threshold is None or distance - threshold <= edge <= distance + threshold:
+                    stack.append(child)
+
+        return [(word, -distance) for distance, _, word in sorted(best, reverse=True)]
+
+    def best(self, query: str, /) -> Optional[str]:
+        """Return the word closest to ``query``, or None if the index is empty"""
+        results = self.search(query, k=1)
+        return results[0][0] if results else None
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __repr__(self) -> str:
+        return f"<FuzzyMatcher size={self.__size}>"
@@ -7,13 +7,13 @@ import traceback
 from functools import partial
 from inspect import iscoroutinefunction
 from types import TracebackType
-from typing import Any, Callable, Coroutine, Generic, Iterable, Iterator, List, Optional, Set, Type, TypeVar, TYPE_CHECKING
+from typing import Any, Callable, Coroutine, Generic, Iterator, List, Optional, Set, Type, TypeVar, TYPE_CHECKING
 
 import discord
 from discord.ext import commands
 from typing_extensions import ParamSpec
 
-from environment import DEFAULT_COMMAND_PREFIX, FUZZY_MATCH
+from environment import DEFAULT_COMMAND_PREFIX
 if TYPE_CHECKING:
     from haruka import Haruka
 
@@ -74,15 +74,7 @@ async def get_custom_prefix(bot: Haruka, message: discord.Message) -> Optional[s
     if message.guild is None:
         return DEFAULT_COMMAND_PREFIX
 
-    pool = bot.pool
-    if pool is not None:
-        async with pool.acquire() as connection:
-            async with connection.cursor() as cursor:
-                await cursor.execute("SELECT pref FROM prefix WHERE id = ?", str(message.guild.id))
-                row = await cursor.fetchone()
-                return DEFAULT_COMMAND_PREFIX if row is None else row[0]
-
-    return None
+    return await bot.interface.get_guild_prefix(message.guild.id)
 
 
 async def get_prefixes(bot: Haruka, message: discord.Message) -> List[str]:
@@ -314,16 +306,6 @@ async def get_reply(message: discord.Message) -> Optional[discord.Message]:
         return await message.channel.fetch_message(message.reference.message_id)
 
 
-async def fuzzy_match(string: str, against: Iterable[str]) -> str:
-    args = [FUZZY_MATCH]
-    args.append(string)
-    args.extend(against)
-
-    process = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE)
-    stdout, _ = await process.communicate()
-    return stdout.decode("utf-8")
-
-
 async def coro_func(value: T) -> T:
     return value
 
@@ -3,17 +3,21 @@ from __future__ import annotations
 import asyncio
 import datetime
 import io
-from typing import Any, Dict, List, Optional, Set, TYPE_CHECKING
+import sys
+from typing import Any, Dict, Literal, Optional, TYPE_CHECKING
 
 import aiohttp
-import async_timeout
 import discord
 from discord.ext import commands, tasks
 from discord.utils import format_dt, utcnow
 
 import environment
 import global_utils
+from caches import SnowflakeCache, SnowflakeSet
+from core import images
 from customs import Context, Loop, Pool
+from metrics import voice_telemetry
+from server.verification import token_cache
 from shared import SharedInterface
 from trees import SlashCommandTree
 from commands.general.help import HelpCommand
@@ -30,9 +34,9 @@ else:
 class Haruka(commands.Bot):
 
     __instances__: Dict[str, Haruka] = {}
-    __processed_message_ids: Set[int] = set()
+    __processed_message_ids: SnowflakeSet = SnowflakeSet(window=datetime.timedelta(seconds=environment.PROCESSED_MESSAGE_WINDOW))
     if TYPE_CHECKING:
-        __transferable_context_cache_update: asyncio.Event
+        _report_log_position: int
         _users_cache: Dict[int, discord.abc.User]
         cooldown_notify: Dict[int, Dict[str, bool]]
         interface: SharedInterface
@@ -40,7 +44,7 @@ class Haruka(commands.Bot):
         owner: Optional[discord.User]
         owner_id: int
         token: str
-        transferable_context_cache: List[Context]
+        transferable_context_cache: SnowflakeCache[Context]
 
     def __init__(self, *, token: str) -> None:
         assert token not in self.__instances__
@@ -55,26 +59,27 @@ class Haruka(commands.Bot):
             case_insensitive=True,
         )
 
-        self.__transferable_context_cache_update = asyncio.Event()
+        self._report_log_position = 0
         self._users_cache = {}
         self.cooldown_notify = {}
         self.interface = SharedInterface()
         self.owner = None
         self.owner_id = environment.OWNER_ID
         self.token = token
-        self.transferable_context_cache = []
+        self.transferable_context_cache = SnowflakeCache(
+            maxsize=environment.TRANSFERABLE_CONTEXT_CACHE_SIZE,
+            window=datetime.timedelta(seconds=environment.TRANSFERABLE_CONTEXT_WINDOW),
+        )
 
         self.interface.add_client(self)
 
         # Global command check
         async def _global_check(ctx: Context) -> bool:
             if not self.interface.is_parallel_command(ctx.command):
-                if ctx.message.id in self.__processed_message_ids:
+                if not self.__processed_message_ids.add(ctx.message.id):
                     return False
 
-                self.__processed_message_ids.add(ctx.message.id)
-
-            return not await self.interface.blacklist_check(ctx.author.id)
+            return not self.interface.blacklist_check(ctx.author.id)
 
         self.add_check(_global_check)
 
@@ -152,11 +157,11 @@ class Haruka(commands.Bot):
         else:
             self.log(f"'{ctx.message.content}' in {ctx.message.id}/{ctx.channel.id} from {ctx.author} ({ctx.author.id}):")
             self.log(global_utils.format_exception(error))
-            await self.report("An error has just occured and was handled by `Haruka.on_command_error`", send_state=False)
+            await self.report_error("An error has just occured and was handled by `Haruka.on_command_error`", error=error)
 
     async def on_error(self, event_method: str, /, *args, **kwargs) -> None:
         await super().on_error(event_method, *args, **kwargs)
-        await self.report("An error has just occured and was handled by `Haruka.on_error`", send_state=False)
+        await self.report_error("An error has just occured and was handled by `Haruka.on_error`", error=sys.exc_info()[1])
 
     async def process_commands(self, message: discord.Message, /) -> None:
         if message.author.bot:
@@ -165,17 +170,12 @@ class Haruka(commands.Bot):
         ctx = await self.get_context(message)
         command = ctx.command
         if command is not None and self.interface.is_transferable_command(command) and ctx.valid:
-            self.transferable_context_cache.append(ctx)
-            self.__transferable_context_cache_update.set()
-            self.__transferable_context_cache_update.clear()
+            self.transferable_context_cache.add(message.id, ctx)
+        else:
+            self.transferable_context_cache.observe(message.id)
 
         await self.invoke(ctx)
 
-    async def wait_for_transferable_cache(self, message_id: int, *, timeout: Optional[float] = None) -> None:
-        async with async_timeout.timeout(timeout) as timeout:
-            while len(self.transferable_context_cache) == 0 or self.transferable_context_cache[-1].message.id < message_id:
-                await self.__transferable_context_cache_update.wait()
-
     def log(self, content: str) -> None:
         is_single_line = "\n" not in content
         logging = f"[HARUKA {self.user} ID={self.user.id}]:"
@@ -188,8 +188,26 @@ class Haruka(commands.Bot):
         message: str,
         *,
         send_state: bool = True,
-        send_log: bool = True
+        send_log: bool = True,
+        log_mode: Literal["tail", "since_last", "full"] = "tail",
     ) -> Optional[discord.Message]:
+        """This function is a coroutine
+
+        Send a report to the bot owner.
+
+        Parameters
+        -----
+        message: ``str``
+            The report message
+        send_state: ``bool``
+            Whether to attach the internal status
+        send_log: ``bool``
+            Whether to attach the log
+        log_mode: Literal["tail", "since_last", "full"]
+            Which part of the log to attach: the last ``LOG_TAIL_SIZE`` bytes, the lines
+            written since the previous "since_last" report (capped to ``LOG_TAIL_SIZE``
+            bytes) or the full log compressed with gzip
+        """
         if self.owner is not None:
             kwargs: Dict[str, Any] = {}
 
@@ -197,12 +215,28 @@ class Haruka(commands.Bot):
                 kwargs["embed"] = self.display_status()
 
             if send_log:
-                self.interface.flush_logs()
-                with open(environment.LOG_PATH, "r", encoding="utf-8") as file:
-                    kwargs["file"] = discord.File(io.StringIO(file.read()), filename="log.txt")
+                logfile = self.interface.logfile
+                if log_mode == "full":
+                    data = await asyncio.to_thread(logfile.compress)
+                    kwargs["file"] = discord.File(io.BytesIO(data), filename="log.txt.gz")
+                else:
+                    if log_mode == "since_last":
+                        content, self._report_log_position = await asyncio.to_thread(logfile.read_since, self._report_log_position, max_bytes=environment.LOG_TAIL_SIZE)
+                    else:
+                        content = await asyncio.to_thread(logfile.tail, environment.LOG_TAIL_SIZE)
+
+                    kwargs["file"] = discord.File(io.StringIO(content), filename="log.txt")
 
             return await self.owner.send(message, **kwargs)
 
+    async def report_error(self, message: str, *, error: Optional[BaseException] = None) -> None:
+        """This function is a coroutine
+
+        Report an error to the bot owner. Reports with identical tracebacks
+        are coalesced and owner DMs are rate limited, see ``ReportAggregator``.
+        """
+        await self.interface.reporter.submit(message, error=error)
+
     def display_status(self) -> discord.Embed:
         guilds = self.guilds
         users = self.users
@@ -249,6 +283,41 @@ class Haruka(commands.Bot):
             value=f"{len(messages)} messages",
             inline=False,
         )
+        embed.add_field(
+            name="Transferable contexts",
+            value=f"{len(self.transferable_context_cache)}/{self.transferable_context_cache.maxsize} contexts",
+            inline=False,
+        )
+        embed.add_field(
+            name="Processed messages",
+            value=f"{len(self.__processed_message_ids)} message IDs (~{self.__processed_message_ids.memory_usage() / 1024:.2f} KiB)",
+            inline=False,
+        )
+        embed.add_field(
+            name="Prefix cache",
+            value=self.interface.prefixes.display_stats(),
+            inline=False,
+        )
+        embed.add_field(
+            name="Token cache",
+            value=token_cache.display_stats(),
+            inline=False,
+        )
+        embed.add_field(
+            name="Voice playback",
+            value=voice_telemetry.display(voice_clients),
+            inline=False,
+        )
+        embed.add_field(
+            name="Image sources",
+            value=images.display_router_stats(),
+            inline=False,
+        )
+        embed.add_field(
+            name="Coalesced error reports",
+            value=f"{self.interface.reporter.suppressed} reports",
+            inline=False,
+        )
         embed.add_field(
             name="Uptime",
             value=utcnow() - self.uptime,
@@ -259,7 +328,7 @@ class Haruka(commands.Bot):
 
     @tasks.loop(hours=12)
     async def _periodic_report(self) -> None:
-        await self.report("This is the periodic report")
+        await self.report("This is the periodic report", log_mode="since_last")
 
     @_periodic_report.before_loop
     async def _periodic_report_before(self) -> None:
@@ -279,7 +348,7 @@ class Haruka(commands.Bot):
 
     async def close(self) -> None:
         await self.interface.close()
-        await self.report("Terminating bot. This is the final report.")
+        await self.report("Terminating bot. This is the final report.", log_mode="full")
         await super().close()
 
     async def fetch_user(self, user_id: int, /) -> discord.User:
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import codecs
+import contextlib
+import gzip
+import io
+import os
+import sys
+import threading
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+
+__all__ = (
+    "LogWriter",
+)
+
+
+class LogWriter:
+    """A file-like object which buffers written text in memory and
+    writes it to the log file in batches from a background thread.
+
+    The buffer is written when its size reaches ``flush_size`` bytes
+    or every ``flush_interval`` seconds, whichever comes first. When
+    the log file grows beyond ``max_size`` bytes, it is rotated to
+    ``<path>.1``. Text written while the buffer holds more than
+    ``max_buffer_size`` bytes (e.g. the disk is failing) is dropped.
+    """
+
+    __slots__ = (
+        "__buffer",
+        "__buffer_size",
+        "__closing",
+        "__condition",
+        "__file",
+        "__file_start",
+        "__flush_requested",
+        "__forwarder",
+        "__io_lock",
+        "__pending_dropped",
+        "__pipe",
+        "__rotated_start",
+        "__thread",
+        "dropped",
+        "errors",
+        "flush_interval",
+        "flush_size",
+        "max_buffer_size",
+        "max_size",
+        "path",
+        "rotations",
+    )
+    if TYPE_CHECKING:
+        __buffer: List[str]
+        __buffer_size: int
+        __closing: bool
+        __condition: threading.Condition
+        __file: io.TextIOWrapper
+        __file_start: int
+        __flush_requested: bool
+        __forwarder: Optional[threading.Thread]
+        __io_lock: threading.Lock
+        __pending_dropped: int
+        __pipe: Optional[int]
+        __rotated_start: int
+        __thread: threading.Thread
+        dropped: int
+        errors: int
+        flush_interval: float
+        flush_size: int
+        max_buffer_size: int
+        max_size: Optional[int]
+        path: str
+        rotations: int
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        flush_interval: float = 1.0,
+        flush_size: int = 65536,
+        max_buffer_size: int = 16 * 1024 * 1024,
+        max_size: Optional[int] = None,
+    ) -> None:
+        self.__buffer = []
+        self.__buffer_size = 0
+        self.__closing = False
+        self.__condition = threading.Condition()
+        self.__file = open(path, "wt", encoding="utf-8")
+        self.__file_start = 0
+        self.__flush_requested = False
+        self.__forwarder = None
+        self.__io_lock = threading.Lock()
+        self.__pending_dropped = 0
+        self.__pipe = None
+        self.__rotated_start = 0
+        self.__thread = threading.Thread(target=self.__writer, name="log-writer", daemon=True)
+        self.dropped = 0
+        self.errors = 0
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_buffer_size = max_buffer_size
+        self.max_size = max_size
+        self.path = path
+        self.rotations = 0
+
+        self.__thread.start()
+
+    @property
+    def closed(self) -> bool:
+        return self.__closing
+
+    def write(self, content: str, /) -> int:
+        """Append ``content`` to the in-memory buffer. This method never
+        blocks on disk I/O and is safe to call from any thread.
+        """
+        with self.__condition:
+            if self.__closing:
+                return 0
+
+            if self.__buffer_size + len(content) > self.max_buffer_size:
+                self.__pending_dropped += len(content)
+                self.dropped += len(content)
+                return 0
+
+            self.__buffer.append(content)
+            self.__buffer_size += len(content)
+            if self.__buffer_size >= self.flush_size:
+                self.__condition.notify()
+
+        return len(content)
+
+    def flush(self) -> None:
+        # Called by logging.StreamHandler after every record. Data is written
+        # by the background thread, so there is nothing to do here.
+        pass
+
+    def request_flush(self) -> None:
+        """Wake up the background thread to write the buffer now, without
+        waiting for it to finish.
+        """
+        with self.__condition:
+            self.__flush_requested = True
+            self.__condition.notify()
+
+    def fileno(self) -> int:
+        # Allow passing this object as stderr of a subprocess. Subprocesses write to a pipe forwarded
+        # to the buffer, whose file descriptor (unlike the log file's) stays valid across rotations.
+        with self.__condition:
+            if self.__pipe is None:
+                read, self.__pipe = os.pipe()
+                self.__forwarder = threading.Thread(target=self.__forward, args=(read,), name="log-forwarder", daemon=True)
+                self.__forwarder.start()
+
+            return self.__pipe
+
+    def __forward(self, fd: int, /) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            while data := os.read(fd, 65536):
+                self.write(decoder.decode(data))
+        finally:
+            os.close(fd)
+
+    # The methods below read the log file and should be called from a separate thread.
+    # Positions are byte offsets within the whole log stream, across rotations.
+
+    def _read_from(self, position: int, /) -> Tuple[bytes, int]:
+        # Read the log stream from ``position`` to its end, including the rotated file and the buffer. Must hold __io_lock.
+        data = b""
+        if position < self.__file_start:
+            with contextlib.suppress(FileNotFoundError):
+                with open(self.path + ".1", "rb") as file:
+                    file.seek(max(0, position - self.__rotated_start))
+                    data = file.read()
+
+        with open(self.path, "rb") as file:
+            file_size = file.seek(0, os.SEEK_END)
+            file.seek(max(0, position - self.__file_start))
+            data += file.read()
+
+        with self.__condition:
+            pending = "".join(self.__buffer).encode("utf-8")
+
+        return data + pending, self.__file_start + file_size + len(pending)
+
+    def tail(self, max_bytes: int, /) -> str:
+        """Return the last ``max_bytes`` bytes of the log, starting at a
+        line boundary. Text which has not been written to disk yet is
+        included.
+        """
+        with self.__io_lock:
+            with open(self.path, "rb") as file:
+                end = self.__file_start + file.seek(0, os.SEEK_END)
+
+            data, _ = self._read_from(max(self.__rotated_start, end - max_bytes))
+
+        data = data[-max_bytes:]
+        if len(data) == max_bytes:
+            # Drop the partial first line
+            _, _, data = data.partition(b"\n")
+
+        return data.decode("utf-8", errors="replace")
+
+    def read_since(self, position: int, /, *, max_bytes: Optional[int] = None) -> Tuple[str, int]:
+        """Return the log written after ``position`` (at most the last
+        ``max_bytes`` bytes of it) and the position to use for the next
+        call.
+        """
+        with self.__io_lock:
+            data, end = self._read_from(position)
+
+        if max_bytes is not None and len(data) > max_bytes:
+            _, _, data = data[-max_bytes:].partition(b"\n")
+
+        return data.decode("utf-8", errors="replace"), end
+
+    def compress(self) -> bytes:
+        """Return the full log, including the rotated file, compressed
+        with gzip.
+        """
+        output = io.BytesIO()
+        with gzip.GzipFile(fileobj=output, mode="wb") as compressor:
+            with self.__io_lock:
+                rotated = self.path + ".1"
+                if os.path.isfile(rotated):
+                    with open(rotated, "rb") as file:
+                        while chunk := file.read(65536):
+                            compressor.write(chunk)
+
+                data, _ = self._read_from(self.__file_start)
+                compressor.write(data)
+
+        return output.getvalue()
+
+    def __writer(self) -> None:
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(
+                    lambda: self.__closing or self.__flush_requested or self.__buffer_size >= self.flush_size,
+                    timeout=self.flush_interval,
+                )
+                closing = self.__closing
+
+            with self.__io_lock:
+                with self.__condition:
+                    batch = self.__buffer
+                    self.__buffer = []
+                    self.__buffer_size = 0
+                    self.__flush_requested = False
+
+                    if self.__pending_dropped > 0:
+                        batch.append(f"[{self.__pending_dropped} characters of logs were dropped]\n")
+                        self.__pending_dropped = 0
+
+                if batch:
+                    try:
+                        if self.__file.closed:
+                            self.__file = open(self.path, "at", encoding="utf-8")
+
+                        self.__file.write("".join(batch))
+                        self.__file.flush()
+
+                        if self.max_size is not None and self.__file.tell() >= self.max_size:
+                            self.__rotate()
+
+                    except OSError as error:
+                        # Keep the thread alive, the next batch may succeed
+                        self.errors += 1
+                        print(f"Unable to write {sum(map(len, batch))} characters to log file {self.path}: {error!r}", file=sys.stderr)
+
+            if closing:
+                return
+
+    def __rotate(self) -> None:
+        size = self.__file.tell()
+        self.__file.close()
+        try:
+            os.replace(self.path, self.path + ".1")
+        except OSError:
+            # Keep appending to the current file
+            self.__file = open(self.path, "at", encoding="utf-8")
+            raise
+
+        self.__rotated_start = self.__file_start
+        self.__file_start += size
+        self.rotations += 1
+        self.__file = open(self.path, "wt", encoding="utf-8")
+
+    def close(self) -> None:
+        """Write all buffered text to disk and close the log file. This
+        method blocks until the background thread finishes.
+        """
+        with self.__condition:
+            if self.__closing:
+                return
+
+            pipe, self.__pipe = self.__pipe, None
+
+        if pipe is not None:
+            # Collect the remaining output of subprocesses, unless some of them are still running
+            os.close(pipe)
+            self.__forwarder.join(timeout=1.0)
+
+        with self.__condition:
+            self.__closing = True
+            self.__condition.notify()
+
+        self.__thread.join()
+        self.__file.close()
+
+    def __repr__(self) -> str:
+        return f"<LogWriter path={self.path!r} closed={self.closed}>"
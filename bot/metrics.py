@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import bisect
+import os
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, TYPE_CHECKING
+
+import discord
+
+
+__all__ = (
+    "Histogram",
+    "ProcessUsage",
+    "VoiceTelemetry",
+    "exponential_buckets",
+    "voice_telemetry",
+)
+
+
+def exponential_buckets(start: float, factor: float, count: int) -> List[float]:
+    """Return ``count`` bucket upper bounds, starting from ``start`` and
+    multiplied by ``factor`` each time
+    """
+    return [start * factor ** index for index in range(count)]
+
+
+class Histogram:
+    """A histogram with fixed bucket upper bounds.
+
+    Observations greater than the last bound are counted in an
+    overflow bucket. Quantiles are estimated as the upper bound of the
+    bucket containing them.
+    """
+
+    __slots__ = (
+        "bounds",
+        "count",
+        "counts",
+        "maximum",
+        "total",
+    )
+    if TYPE_CHECKING:
+        bounds: List[float]
+        count: int
+        counts: List[int]
+        maximum: float
+        total: float
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = sorted(bounds)
+        self.count = 0
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.maximum = 0.0
+        self.total = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def observe(self, value: float, /) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.maximum = max(self.maximum, value)
+        self.total += value
+
+    def quantile(self, q: float, /) -> float:
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.maximum)
+
+        return self.maximum
+
+    def display(self, *, unit: str = "s") -> str:
+        if self.count == 0:
+            return "No data"
+
+        return f"{self.count} samples, mean {self.mean:.3f}{unit}, p50 {self.quantile(0.5):.3f}{unit}, p95 {self.quantile(0.95):.3f}{unit}, max {self.maximum:.3f}{unit}"
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.maximum,
+            "buckets": [{"le": bound, "count": count} for bound, count in zip(self.bounds, self.counts)] + [{"le": None, "count": self.counts[-1]}],
+        }
+
+    def __repr__(self) -> str:
+        return f"<Histogram count={self.count} mean={self.mean:.3f} max={self.maximum:.3f}>"
+
+
+try:
+    CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    CLOCK_TICKS = 100
+    PAGE_SIZE = 4096
+
+
+class ProcessUsage(NamedTuple):
+    pid: int
+    cpu_seconds: float
+    cpu_percent: float
+    rss: int
+
+    @classmethod
+    def read(cls, pid: int, *, started: float) -> Optional[ProcessUsage]:
+        """Read the resource usage of a process from ``/proc``, ``started``
+        is the ``time.perf_counter()`` value when the process was spawned.
+
+        Returns None if the information is unavailable, e.g. the process
+        has exited or the platform is not Linux.
+        """
+        try:
+            with open(f"/proc/{pid}/stat", "r", encoding="utf-8") as file:
+                # The process name may contain spaces, skip to the closing parenthesis
+                fields = file.read().rpartition(")")[2].split()
+
+            with open(f"/proc/{pid}/statm", "r", encoding="utf-8") as file:
+                resident_pages = int(file.read().split()[1])
+
+        except (OSError, IndexError, ValueError):
+            return None
+
+        # utime and stime are the 14th and 15th fields of /proc/[pid]/stat
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        elapsed = time.perf_counter() - started
+        return cls(
+            pid=pid,
+            cpu_seconds=cpu_seconds,
+            cpu_percent=100 * cpu_seconds / elapsed if elapsed > 0 else 0.0,
+            rss=resident_pages * PAGE_SIZE,
+        )
+
+
+class VoiceTelemetry:
+    """Counters and histograms of music playback, shared by all
+    ``AudioPlayer`` instances.
+    """
+
+    __slots__ = (
+        "audio_url_errors",
+        "audio_url_latency",
+        "cached_plays",
+        "empty_streams",
+        "first_packet_latency",
+        "playback_errors",
+        "tracks_played",
+        "underruns",
+    )
+    if TYPE_CHECKING:
+        audio_url_errors: int
+        audio_url_latency: Histogram
+        cached_plays: int
+        empty_streams: int
+        first_packet_latency: Histogram
+        playback_errors: int
+        tracks_played: int
+        underruns: int
+
+    def __init__(self) -> None:
+        self.audio_url_errors = 0
+        self.audio_url_latency = Histogram(exponential_buckets(0.05, 2, 10))
+        self.cached_plays = 0
+        self.empty_streams = 0
+        self.first_packet_latency = Histogram(exponential_buckets(0.025, 2, 10))
+        self.playback_errors = 0
+        self.tracks_played = 0
+        self.underruns = 0
+
+    @staticmethod
+    def usage(players: Iterable[discord.VoiceProtocol]) -> Dict[int, ProcessUsage]:
+        """Return the resource usage of the FFmpeg process of each player,
+        mapped by guild ID
+        """
+        result = {}
+        for player in players:
+            usage = getattr(player, "process_usage", lambda: None)()
+            if usage is not None:
+                result[player.guild.id] = usage
+
+        return result
+
+    def display(self, players: Iterable[discord.VoiceProtocol]) -> str:
+        usage = self.usage(players)
+        lines = [
+            f"{self.tracks_played} tracks played ({self.cached_plays} from local cache)",
+            f"Errors: {self.audio_url_errors} audio URL, {self.playback_errors} playback, {self.empty_streams} empty streams, {self.underruns} underruns",
+            f"Audio URL wait: {self.audio_url_latency.display()}",
+            f"First packet: {self.first_packet_latency.display()}",
+        ]
+        if usage:
+            cpu_percent = sum(u.cpu_percent for u in usage.values())
+            rss = sum(u.rss for u in usage.values())
+            lines.append(f"{len(usage)} FFmpeg processes: {cpu_percent:.1f}% CPU, {rss / 1024 ** 2:.1f} MiB RSS")
+
+        return "\n".join(lines)
+
+    def to_json(self, players: Iterable[discord.VoiceProtocol]) -> Dict[str, Any]:
+        processes: List[Dict[str, Any]] = []
+        for guild_id, usage in self.usage(players).items():
+            data = usage._asdict()
+            data["guild_id"] = str(guild_id)
+            processes.append(data)
+
+        return {
+            "tracks_played": self.tracks_played,
+            "cached_plays": self.cached_plays,
+            "audio_url_errors": self.audio_url_errors,
+            "playback_errors": self.playback_errors,
+            "empty_streams": self.empty_streams,
+            "underruns": self.underruns,
+            "audio_url_latency": self.audio_url_latency.to_json(),
+            "first_packet_latency": self.first_packet_latency.to_json(),
+            "processes": processes,
+        }
+
+    def __repr__(self) -> str:
+        return f"<VoiceTelemetry tracks_played={self.tracks_played} playback_errors={self.playback_errors}>"
+
+
+voice_telemetry = VoiceTelemetry()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from typing import Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from customs import Cursor, Pool
+
+
+__all__ = (
+    "MIGRATIONS",
+    "migrate",
+)
+
+
+# Each item is a T-SQL batch which upgrades the database schema by one version. Migrations are
+# applied in order and must never be modified once deployed, append a new one instead.
+MIGRATIONS: Tuple[str, ...] = (
+    # Version 1: initial schema
+    """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = 'blacklist') CREATE TABLE blacklist (id varchar(max));
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = 'prefix') CREATE TABLE prefix (id varchar(max), pref varchar(max));
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = 'tokens') CREATE TABLE tokens (id varchar(max), token varchar(max));
+    """,
+    # Version 2: bounded key types with primary keys and unique indexes
+    """
+    CREATE TABLE blacklist_v2 (
+        id bigint NOT NULL CONSTRAINT pk_blacklist PRIMARY KEY
+    );
+    INSERT INTO blacklist_v2 (id)
+        SELECT DISTINCT TRY_CAST(id AS bigint) FROM blacklist
+        WHERE TRY_CAST(id AS bigint) IS NOT NULL;
+    DROP TABLE blacklist;
+    EXEC sp_rename 'blacklist_v2', 'blacklist';
+
+    CREATE TABLE prefix_v2 (
+        id bigint NOT NULL CONSTRAINT pk_prefix PRIMARY KEY,
+        pref nvarchar(50) NOT NULL
+    );
+    INSERT INTO prefix_v2 (id, pref)
+        SELECT TRY_CAST(id AS bigint), MAX(LEFT(pref, 50)) FROM prefix
+        WHERE TRY_CAST(id AS bigint) IS NOT NULL AND pref IS NOT NULL
+        GROUP BY TRY_CAST(id AS bigint);
+    DROP TABLE prefix;
+    EXEC sp_rename 'prefix_v2', 'prefix';
+
+    CREATE TABLE tokens_v2 (
+        id bigint NOT NULL CONSTRAINT pk_tokens PRIMARY KEY,
+        token varchar(64) NOT NULL CONSTRAINT uq_tokens_token UNIQUE
+    );
+    INSERT INTO tokens_v2 (id, token)
+        SELECT TRY_CAST(id AS bigint), MAX(token) FROM tokens
+        WHERE TRY_CAST(id AS bigint) IS NOT NULL AND token IS NOT NULL AND LEN(token) <= 64
+        GROUP BY TRY_CAST(id AS bigint);
+    DROP TABLE tokens;
+    EXEC sp_rename 'tokens_v2', 'tokens';
+    """,
+)
+
+
+async def _schema_version(cursor: Cursor) -> int:
+    await cursor.execute("SELECT MAX(version) FROM schema_version")
+    row = await cursor.fetchone()
+    return 0 if row is None or row[0] is None else row[0]
+
+
+async def migrate(pool: Pool) -> Tuple[int, int]:
+    """This function is a coroutine
+
+    Apply all pending migrations to the database. Each migration is
+    executed within a transaction together with the version bump.
+
+    Parameters
+    -----
+    pool: ``Pool``
+        The database connection pool
+
+    Returns
+    -----
+    Tuple[``int``, ``int``]
+        The schema versions before and after migrating
+
+    Raises
+    -----
+    `RuntimeError`: A migration batch completed without bumping the schema version
+    """
+    async with pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute("IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = 'schema_version') CREATE TABLE schema_version (version int NOT NULL)")
+            initial = current = await _schema_version(cursor)
+
+            for version, migration in enumerate(MIGRATIONS[current:], start=current + 1):
+                await cursor.execute(f"SET NOCOUNT ON; SET XACT_ABORT ON; BEGIN TRANSACTION; {migration} INSERT INTO schema_version VALUES ({version}); COMMIT TRANSACTION;")
+
+                # Errors raised after the first result of a batch are only surfaced when
+                # reaching their result set, and closing the cursor early may cancel the batch
+                while await cursor.nextset():
+                    pass
+
+                current = await _schema_version(cursor)
+                if current != version:
+                    raise RuntimeError(f"Migration to schema version {version} did not complete (schema version is {current})")
+
+    return initial, current
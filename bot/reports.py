@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import traceback
+from typing import Any, Callable, Coroutine, Dict, Optional, TYPE_CHECKING
+
+from global_utils import format, slice_string
+
+
+__all__ = (
+    "TokenBucket",
+    "ReportAggregator",
+)
+
+
+class TokenBucket:
+    """A token bucket rate limiter, refilling ``rate`` tokens per second
+    up to ``capacity`` tokens.
+    """
+
+    __slots__ = (
+        "__tokens",
+        "__updated",
+        "capacity",
+        "rate",
+    )
+    if TYPE_CHECKING:
+        __tokens: float
+        __updated: float
+        capacity: float
+        rate: float
+
+    def __init__(self, *, capacity: float, rate: float) -> None:
+        self.__tokens = capacity
+        self.__updated = time.monotonic()
+        self.capacity = capacity
+        self.rate = rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+        self.__updated = now
+
+    def consume(self, amount: float = 1.0, /) -> bool:
+        """Take ``amount`` tokens from the bucket if possible
+
+        Returns
+        -----
+        ``bool``
+            Whether the tokens were taken
+        """
+        self._refill()
+        if self.__tokens >= amount:
+            self.__tokens -= amount
+            return True
+
+        return False
+
+    def delay(self, amount: float = 1.0, /) -> float:
+        """The number of seconds until ``amount`` tokens are available"""
+        self._refill()
+        return max(0.0, (amount - self.__tokens) / self.rate)
+
+    def __repr__(self) -> str:
+        self._refill()
+        return f"<TokenBucket tokens={self.__tokens:.2f} capacity={self.capacity} rate={self.rate}>"
+
+
+class _ReportGroup:
+
+    __slots__ = (
+        "count",
+        "message",
+        "reported",
+        "summary",
+    )
+    if TYPE_CHECKING:
+        count: int
+        message: str
+        reported: int
+        summary: Optional[str]
+
+    def __init__(self, message: str, *, summary: Optional[str]) -> None:
+        self.count = 0
+        self.message = message
+        self.reported = 0
+        self.summary = summary
+
+    def display(self) -> str:
+        line = f"- **{self.count - self.reported}x** "
+        if self.summary is not None:
+            line += f"`{slice_string(self.summary, 200)}` - "
+
+        return line + self.message
+
+
+class ReportAggregator:
+    """Coalesce error reports with identical tracebacks.
+
+    The first occurrence of an error within a time window is sent
+    immediately if the rate limiter allows it. Other occurrences are
+    counted and sent as a single digest when the window ends.
+    """
+
+    __slots__ = (
+        "__flusher",
+        "__groups",
+        "bucket",
+        "send",
+        "suppressed",
+        "window",
+    )
+    if TYPE_CHECKING:
+        __flusher: Optional[asyncio.Task[None]]
+        __groups: Dict[str, _ReportGroup]
+        bucket: TokenBucket
+        send: Callable[[str], Coroutine[Any, Any, Any]]
+        suppressed: int
+        window: float
+
+    def __init__(self, send: Callable[[str], Coroutine[Any, Any, Any]], *, window: float, bucket: TokenBucket) -> None:
+        self.__flusher = None
+        self.__groups = {}
+        self.bucket = bucket
+        self.send = send
+        self.suppressed = 0
+        self.window = window
+
+    @staticmethod
+    def fingerprint(message: str, error: Optional[BaseException]) -> str:
+        if error is None:
+            return message
+
+        return "".join(traceback.format_exception(error.__class__, error, error.__traceback__))
+
+    @staticmethod
+    def summarize(error: Optional[BaseException]) -> Optional[str]:
+        # The last line of the traceback, i.e. the exception type and message
+        if error is None:
+            return None
+
+        return traceback.format_exception_only(error.__class__, error)[-1].strip()
+
+    async def submit(self, message: str, *, error: Optional[BaseException] = None) -> None:
+        """This function is a coroutine
+
+        Submit an error report.
+
+        Parameters
+        -----
+        message: ``str``
+            The report message
+        error: Optional[``BaseException``]
+            The reported exception, reports with identical tracebacks
+            are grouped together
+        """
+        key = self.fingerprint(message, error)
+        try:
+            group = self.__groups[key]
+        except KeyError:
+            group = self.__groups[key] = _ReportGroup(message, summary=self.summarize(error))
+
+        group.count += 1
+        if self.__flusher is None or self.__flusher.done():
+            self.__flusher = asyncio.create_task(self.__flush_after_window())
+
+        if group.reported == 0 and self.bucket.consume():
+            group.reported = 1
+            await self.send(message)
+        else:
+            self.suppressed += 1
+
+    async def __flush_after_window(self) -> None:
+        while self.__groups:
+            await asyncio.sleep(self.window)
+
+            groups = self.__groups
+            self.__groups = {}
+
+            lines = [group.display() for group in groups.values() if group.count > group.reported]
+            if lines:
+                await asyncio.sleep(self.bucket.delay())
+                self.bucket.consume()
+
+                header = f"Error digest for the last {format(self.window)}, {len(lines)} distinct error(s) were coalesced:\n"
+                await self.send(slice_string(header + "\n".join(lines), 1900))
+
+    def __repr__(self) -> str:
+        return f"<ReportAggregator window={self.window} groups={len(self.__groups)} suppressed={self.suppressed}>"
@@ -35,7 +35,7 @@ async def report(request: Request, handler: Handler) -> web.Response:
         request_info = f"Method: {request.method}\nURL: {request.url}\nHeaders:\n-----\n{headers_info}\n-----\n{e}"
         interface.log(f"Error serving request:\n{request_info}\n{format_exception(e)}")
 
-        await interface.client.report("An error has just occured while processing a server request.", send_state=False)
+        await interface.client.report_error("An error has just occured while processing a server request.", error=e)
         raise web.HTTPInternalServerError
 
 
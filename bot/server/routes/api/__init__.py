@@ -5,6 +5,7 @@ from .router import *
 from .throw import *
 from .tic_tac_toe import *
 from .upload import *
+from .voice import *
 
 
 __all__ = ("router",)
@@ -5,7 +5,7 @@ from typing import TYPE_CHECKING
 from aiohttp import web
 
 from .router import router
-from ...verification import authenticate_request, generate_token, otp_cache
+from ...verification import authenticate_request, generate_token, otp_cache, revoke_token
 from ...web_utils import json_encode
 if TYPE_CHECKING:
     from ...customs import Request
@@ -30,3 +30,13 @@ async def handler_post(request: Request) -> web.Response:
             return web.json_response({"success": True, "user": json_encode(user), "token": token})
 
     return web.json_response({"success": False})
+
+
+@router.delete("/login")
+async def handler_delete(request: Request) -> web.Response:
+    user = await authenticate_request(request)
+    if user is not None:
+        await revoke_token(user, interface=request.app.interface)
+        return web.json_response({"success": True})
+
+    return web.json_response({"success": False})
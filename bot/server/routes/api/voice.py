@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+
+from environment import OWNER_ID
+from metrics import voice_telemetry
+from .router import router
+from ...verification import authenticate_request
+if TYPE_CHECKING:
+    from ...customs import Request
+
+
+@router.get("/voice")
+async def handler(request: Request) -> web.Response:
+    user = await authenticate_request(request)
+    if user is not None and user.id == OWNER_ID:
+        players = [player for client in request.app.interface.clients for player in client.voice_clients]
+        data = voice_telemetry.to_json(players)
+        data["voice_clients"] = len(players)
+        return web.json_response(data)
+
+    raise web.HTTPForbidden
@@ -12,6 +12,8 @@ from discord import abc
 from discord.ext import tasks
 from discord.utils import utcnow, sleep_until
 
+from caches import TTLCache
+from environment import TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
 if TYPE_CHECKING:
     from shared import SharedInterface
     from .customs import Request
@@ -19,7 +21,9 @@ if TYPE_CHECKING:
 
 __all__ = (
     "otp_cache",
+    "token_cache",
     "generate_token",
+    "revoke_token",
     "authenticate_request",
     "authenticate_websocket",
 )
@@ -85,30 +89,50 @@ class OTPCache:
 
 
 otp_cache = OTPCache()
+token_cache: TTLCache[str, abc.User] = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
 
 
 async def generate_token(user: abc.User, *, interface: SharedInterface) -> str:
     async with interface.pool.acquire() as connection:
         async with connection.cursor() as cursor:
-            await cursor.execute("SELECT * FROM tokens WHERE id = ?", str(user.id))
+            await cursor.execute("SELECT id, token FROM tokens WHERE id = ?", user.id)
             row = await cursor.fetchone()
             if row is not None:
-                return row[1]
+                token = row[1]
+            else:
+                token = f"{user.id}.{secrets.token_hex(16)}"
+                await cursor.execute("INSERT INTO tokens (id, token) VALUES (?, ?)", user.id, token)
 
-            token = f"{user.id}.{secrets.token_hex(16)}"
-            await cursor.execute("INSERT INTO tokens (id, token) VALUES (?, ?)", str(user.id), token)
+    token_cache.put(token, user)
+    return token
 
-            return token
+
+async def revoke_token(user: abc.User, *, interface: SharedInterface) -> None:
+    """This function is a coroutine
+
+    Revoke the token associated with a user, if any.
+    """
+    async with interface.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute("DELETE FROM tokens WHERE id = ?", user.id)
+
+    token_cache.discard_if(lambda _, cached_user: cached_user.id == user.id)
 
 
 async def _get_user(token: str, *, interface: SharedInterface) -> Optional[abc.User]:
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
     async with interface.pool.acquire() as connection:
         async with connection.cursor() as cursor:
-            await cursor.execute("SELECT * FROM tokens WHERE token = ?", token)
+            await cursor.execute("SELECT id FROM tokens WHERE token = ?", token)
             row = await cursor.fetchone()
 
-            if row is not None:
-                return await interface.client.fetch_user(int(row[0]))
+    if row is not None:
+        user = await interface.client.fetch_user(int(row[0]))
+        token_cache.put(token, user)
+        return user
 
 
 async def authenticate_request(request: Request) -> Optional[abc.User]:
@@ -3,7 +3,6 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import datetime
-import io
 import signal
 import sys
 from typing import Any, Callable, ClassVar, Coroutine, Dict, List, Optional, Set, TypeVar, Union, TYPE_CHECKING
@@ -18,8 +17,12 @@ from discord.utils import utcnow
 if TYPE_CHECKING:
     from typing_extensions import Concatenate, ParamSpec
 
+from caches import LRUCache
 from customs import Context, Pool
-from environment import LOG_PATH, ODBC_CONNECTION_STRING, PORT
+from environment import BLACKLIST_REFRESH_INTERVAL, DEFAULT_COMMAND_PREFIX, LOG_FLUSH_INTERVAL, LOG_FLUSH_SIZE, LOG_MAX_BUFFER_SIZE, LOG_MAX_SIZE, LOG_PATH, ODBC_CONNECTION_STRING, PORT, PREFIX_CACHE_SIZE, REPORT_COALESCE_WINDOW, REPORT_RATE_LIMIT_CAPACITY, REPORT_RATE_LIMIT_RATE
+from logs import LogWriter
+from migrations import migrate
+from reports import ReportAggregator, TokenBucket
 from server import MainApp
 if TYPE_CHECKING:
     from haruka import Haruka
@@ -37,6 +40,7 @@ class SharedInterface:
 
     __instance__: ClassVar[Optional[SharedInterface]] = None
     __slots__ = (
+        "__blacklist_refresher",
         "__parallel_commands",
         "__pool",
         "__proxy_session",
@@ -47,14 +51,18 @@ class SharedInterface:
         "_closed",
         "_started",
         "_transfer_exclusion",
+        "blacklist",
         "clients",
         "commands",
         "log",
         "logfile",
+        "prefixes",
+        "reporter",
         "slash_commands",
         "uptime",
     )
     if TYPE_CHECKING:
+        __blacklist_refresher: Optional[asyncio.Task[None]]
         __parallel_commands: Set[commands.Command]
         __pool: Optional[Pool]
         __proxy_session: Optional[aiohttp.ClientSession]
@@ -65,16 +73,20 @@ class SharedInterface:
         _closed: bool
         _started: bool
         _transfer_exclusion: Dict[int, Set[Haruka]]
+        blacklist: Set[int]
         clients: List[Haruka]
         commands: Set[commands.Command]
         log: Callable[[str], None]
-        logfile: io.TextIOWrapper
+        logfile: LogWriter
+        prefixes: LRUCache[int, str]
+        reporter: ReportAggregator
         slash_commands: Set[app_commands.Command]
         uptime: datetime.datetime
 
     def __new__(cls) -> SharedInterface:
         if cls.__instance__ is None:
             self = super().__new__(cls)
+            self.__blacklist_refresher = None
             self.__parallel_commands = set()
             self.__pool = None
             self.__proxy_session = None
@@ -85,10 +97,17 @@ class SharedInterface:
             self._closed = False
             self._started = False
             self._transfer_exclusion = {}
+            self.blacklist = set()
             self.clients = []
             self.commands = set()
             self.log = self._log
-            self.logfile = open(LOG_PATH, "wt", encoding="utf-8")
+            self.logfile = LogWriter(LOG_PATH, flush_interval=LOG_FLUSH_INTERVAL, flush_size=LOG_FLUSH_SIZE, max_buffer_size=LOG_MAX_BUFFER_SIZE, max_size=LOG_MAX_SIZE)
+            self.prefixes = LRUCache(maxsize=PREFIX_CACHE_SIZE)
+            self.reporter = ReportAggregator(
+                self.__send_report,
+                window=REPORT_COALESCE_WINDOW,
+                bucket=TokenBucket(capacity=REPORT_RATE_LIMIT_CAPACITY, rate=REPORT_RATE_LIMIT_RATE),
+            )
             self.slash_commands = set()
             self.uptime = utcnow()
 
@@ -128,14 +147,22 @@ class SharedInterface:
     def add_client(self, client: Haruka) -> None:
         self.clients.append(client)
 
+    async def __send_report(self, message: str) -> None:
+        # Owner DMs of all clients share the same aggregator, send them from the first one
+        client = self.client
+        if client is not None:
+            await client.report(message, send_state=False)
+
     def flush_logs(self) -> None:
+        """Ask the log writer to write buffered logs to disk as soon as
+        possible. This method does not block.
+        """
         if not self.logfile.closed:
-            self.logfile.flush()
+            self.logfile.request_flush()
 
     def _log(self, content: str) -> None:
         if not self.logfile.closed:
             self.logfile.write(content + "\n")
-            self.flush_logs()
 
     async def transfer(self, original_ctx: Context) -> bool:
         command = original_ctx.command
@@ -151,27 +178,9 @@ class SharedInterface:
 
         for client in self.clients:
             if client not in self._transfer_exclusion[message_id]:
-                transferable_context_cache = client.transferable_context_cache
-                await client.wait_for_transferable_cache(message_id, timeout=1.0)  # Make sure that transferable_context_cache is properly populated
-
-                # Binary search transferable_context_cache, hopefully it is sorted (it should be!) according to message IDs
-                low = 0
-                high = len(transferable_context_cache)
-
-                if high == 0:
-                    continue
-
-                # Result is in interval [low, high)
-                while high - low > 1:
-                    mid = (low + high) // 2
-                    ctx = transferable_context_cache[mid]
-                    if ctx.message.id > message_id:
-                        high = mid
-                    else:
-                        low = mid
-
-                ctx = transferable_context_cache[low]
-                if ctx.message.id == message_id:
+                # Wait until the client has processed the message
+                ctx = await client.transferable_context_cache.wait_for(message_id, timeout=1.0)
+                if ctx is not None:
                     asyncio.create_task(ctx.reinvoke())
                     return True
 
@@ -298,13 +307,16 @@ class SharedInterface:
             )
             pool = self.pool
             assert pool is not None
-            async with pool.acquire() as connection:
-                async with connection.cursor() as cursor:
-                    await cursor.execute("IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = 'blacklist') CREATE TABLE blacklist (id varchar(max))")
-                    await cursor.execute("IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = 'prefix') CREATE TABLE prefix (id varchar(max), pref varchar(max))")
-                    await cursor.execute("IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = 'tokens') CREATE TABLE tokens (id varchar(max), token varchar(max))")
+            initial, current = await migrate(pool)
+            if initial == current:
+                self.log(f"Initialized database (schema version {current})")
+            else:
+                self.log(f"Initialized database (migrated schema from version {initial} to {current})")
 
-            self.log("Initialized database")
+            await self.load_prefixes()
+            await self.load_blacklist()
+            if BLACKLIST_REFRESH_INTERVAL is not None:
+                self.__blacklist_refresher = asyncio.create_task(self.__refresh_blacklist(BLACKLIST_REFRESH_INTERVAL))
 
         if self.__webapp is None:
             self.__webapp = webapp = MainApp(interface=self)
@@ -332,6 +344,8 @@ class SharedInterface:
 
     def setup_signal_handler(self) -> None:
         def graceful_exit() -> None:
+            # Get buffered logs to disk early in case shutting down hangs and the process gets killed
+            self.flush_logs()
             raise KeyboardInterrupt
 
         if sys.platform == "linux":
@@ -341,17 +355,132 @@ class SharedInterface:
             loop.add_signal_handler(signal.SIGTERM, graceful_exit)
             self.log("Added signal handler")
 
-    async def blacklist_check(self, id: int, /) -> bool:
+    async def load_prefixes(self) -> None:
+        """This function is a coroutine
+
+        Populate the prefix cache with the custom prefixes stored
+        in the database.
+        """
         async with self.pool.acquire() as connection:
             async with connection.cursor() as cursor:
-                await cursor.execute("SELECT * FROM blacklist WHERE id = ?", str(id))
-                return await cursor.fetchone() is not None
+                await cursor.execute("SELECT id, pref FROM prefix")
+                rows = await cursor.fetchall()
+
+        self.prefixes.clear()
+        self.prefixes.update((int(row[0]), row[1]) for row in rows[:self.prefixes.maxsize])
+        self.log(f"Loaded {len(self.prefixes)} custom prefixes")
+
+    async def get_guild_prefix(self, guild_id: int, /) -> Optional[str]:
+        """This function is a coroutine
+
+        Get the command prefix of a guild. The database is only
+        queried on a cache miss.
+
+        Parameters
+        -----
+        guild_id: ``int``
+            The ID of the guild
+
+        Returns
+        -----
+        Optional[``str``]
+            The prefix of the guild, will be None if the database
+            pool hasn't been initialized yet
+        """
+        prefix = self.prefixes.get(guild_id)
+        if prefix is not None:
+            return prefix
+
+        pool = self.pool
+        if pool is not None:
+            async with pool.acquire() as connection:
+                async with connection.cursor() as cursor:
+                    await cursor.execute("SELECT pref FROM prefix WHERE id = ?", guild_id)
+                    row = await cursor.fetchone()
+
+            prefix = DEFAULT_COMMAND_PREFIX if row is None else row[0]
+            self.prefixes.put(guild_id, prefix)
+            return prefix
+
+        return None
+
+    async def set_guild_prefix(self, guild_id: int, prefix: str, /) -> None:
+        """This function is a coroutine
+
+        Change the command prefix of a guild, writing through
+        to the database and the prefix cache.
+        """
+        async with self.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    """
+                    MERGE prefix WITH (HOLDLOCK) AS target
+                    USING (SELECT ? AS id, ? AS pref) AS source
+                    ON target.id = source.id
+                    WHEN MATCHED THEN UPDATE SET pref = source.pref
+                    WHEN NOT MATCHED THEN INSERT (id, pref) VALUES (source.id, source.pref);
+                    """,
+                    guild_id,
+                    prefix,
+                )
+
+        self.prefixes.put(guild_id, prefix)
+
+    async def load_blacklist(self) -> None:
+        """This function is a coroutine
+
+        Replace the in-memory blacklist with a snapshot from the
+        database.
+        """
+        async with self.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("SELECT id FROM blacklist")
+                rows = await cursor.fetchall()
+
+        self.blacklist = set(int(row[0]) for row in rows)
+
+    async def __refresh_blacklist(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load_blacklist()
+            except Exception as exc:
+                self.log(f"Unable to refresh the blacklist: {exc!r}")
+
+    def blacklist_check(self, id: int, /) -> bool:
+        return id in self.blacklist
+
+    async def add_to_blacklist(self, id: int, /) -> None:
+        if id in self.blacklist:
+            return
+
+        async with self.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("IF NOT EXISTS (SELECT * FROM blacklist WHERE id = ?) INSERT INTO blacklist VALUES (?)", id, id)
+
+        self.blacklist.add(id)
+
+    async def remove_from_blacklist(self, id: int, /) -> None:
+        async with self.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("DELETE FROM blacklist WHERE id = ?", id)
+
+        self.blacklist.discard(id)
 
     async def close(self) -> None:
         if not self._closed:
             self._closed = True
             self.log("Closing interface")
 
+            if self.__blacklist_refresher is not None:
+                self.__blacklist_refresher.cancel()
+
+            # Imported here, core.youtube depends on this module
+            from core.youtube import YouTubeClient
+            if YouTubeClient.__instance__ is not None:
+                YouTubeClient.__instance__.close()
+                self.log("Closed YouTube client")
+
             if self.__session is not None:
                 await self.__session.close()
                 self.log("Closed HTTP session")
@@ -365,7 +494,7 @@ class SharedInterface:
                 await self.__pool.wait_closed()
                 self.log("Closed database pool")
 
-            self.logfile.close()
+            await asyncio.to_thread(self.logfile.close)
             self.log = print
 
 
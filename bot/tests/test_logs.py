@@ -0,0 +1,100 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from logs import LogWriter
+
+
+class TestLogRotation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "log.txt")
+        self.writer = LogWriter(self.path, flush_interval=60.0, max_size=100)
+
+    def tearDown(self) -> None:
+        self.writer.close()
+        self.directory.cleanup()
+
+    def write_and_rotate(self, lines: int) -> str:
+        content = "".join(f"line {index:03d}\n" for index in range(lines))
+        self.writer.write(content)
+        self.writer.close()
+        self.assertEqual(self.writer.rotations, 1)
+        return content
+
+    def test_tail_after_rotation(self) -> None:
+        content = self.write_and_rotate(12)
+        self.assertEqual(os.path.getsize(self.path), 0)
+        self.assertEqual(self.writer.tail(30), content[-27:])
+
+    def test_read_since_after_rotation(self) -> None:
+        content = self.write_and_rotate(12)
+        data, position = self.writer.read_since(0)
+        self.assertEqual(data, content)
+        self.assertEqual(position, len(content))
+
+        data, _ = self.writer.read_since(0, max_bytes=50)
+        self.assertEqual(data, content[-45:])
+
+    def test_read_since_across_rotation(self) -> None:
+        self.writer.write("before\n")
+        _, position = self.writer.read_since(0)
+        content = self.write_and_rotate(12)
+        data, _ = self.writer.read_since(position)
+        self.assertEqual(data, content)
+
+
+class TestLogWriter(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "log.txt")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_subprocess_output_across_rotation(self) -> None:
+        writer = LogWriter(self.path, max_size=100)
+        writer.write("x" * 120 + "\n")
+        writer.request_flush()
+        subprocess.run([sys.executable, "-c", "import sys; sys.stderr.write('from subprocess\\n')"], stderr=writer, check=True)
+        writer.close()
+
+        self.assertEqual(writer.rotations, 1)
+        self.assertTrue(writer.tail(1024).endswith("from subprocess\n"))
+
+    def test_failed_rotation(self) -> None:
+        os.mkdir(self.path + ".1")  # os.replace fails on a directory
+        writer = LogWriter(self.path, max_size=10)
+        writer.write("first line\n")
+        writer.request_flush()
+        for _ in range(100):
+            if writer.errors > 0:
+                break
+
+            time.sleep(0.01)
+
+        writer.write("second line\n")
+        writer.close()
+
+        self.assertEqual(writer.rotations, 0)
+        with open(self.path, "r", encoding="utf-8") as file:
+            self.assertEqual(file.read(), "first line\nsecond line\n")
+
+    def test_buffer_limit(self) -> None:
+        writer = LogWriter(self.path, flush_interval=60.0, max_buffer_size=10)
+        self.assertEqual(writer.write("12345\n"), 6)
+        self.assertEqual(writer.write("1234567890\n"), 0)
+        writer.close()
+
+        self.assertEqual(writer.dropped, 11)
+        with open(self.path, "r", encoding="utf-8") as file:
+            self.assertEqual(file.read(), "12345\n[11 characters of logs were dropped]\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
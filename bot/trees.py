@@ -15,7 +15,7 @@ class SlashCommandTree(app_commands.CommandTree):
         client: Haruka
 
     async def interaction_check(self, interaction: Interaction) -> bool:
-        if await self.client.interface.blacklist_check(interaction.user.id):
+        if self.client.interface.blacklist_check(interaction.user.id):
             await interaction.response.send_message("You are currently in the blacklist!", ephemeral=True)
             return False
         else:
@@ -26,4 +26,4 @@ class SlashCommandTree(app_commands.CommandTree):
             return
 
         await super().on_error(interaction, error)
-        await self.client.report("An error has just occured and was handled by `SlashCommandTree.on_error`", send_state=False)
+        await self.client.report_error("An error has just occured and was handled by `SlashCommandTree.on_error`", error=error)